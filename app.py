@@ -1,14 +1,44 @@
-from flask import Flask, render_template, request, jsonify, abort 
+from flask import Flask, render_template, request, jsonify, abort, g, Response
 import sqlite3
 import os
+import time
+import threading
+import bisect
+import math
 from datetime import datetime, timedelta
 import requests
+from werkzeug.exceptions import HTTPException
+from metrics import REGISTRY, CONTENT_TYPE
+import profiler
 
 app = Flask(__name__)
 
+# Metrics
+REQUEST_SECONDS = REGISTRY.histogram("http_request_seconds", "Request latency by route")
+REQUESTS = REGISTRY.counter("http_requests_total", "Requests by route and status")
+UPLOAD_RESULTS = REGISTRY.counter("upload_results_total", "Upload outcomes")
+DB_COMMIT_SECONDS = REGISTRY.histogram("db_commit_seconds", "Attendance upsert + commit latency")
+RENDER_SYNC = REGISTRY.counter("render_sync_total", "Pushes to the Render server by result")
+DB_LOCK_WAIT_SECONDS = REGISTRY.histogram("db_lock_wait_seconds", "Time waiting for the SQLite write lock")
+DB_LOCK_TIMEOUTS = REGISTRY.counter("db_lock_timeouts_total", "Uploads that gave up waiting for the write lock")
+# One series per gunicorn worker, so scrapers can tell workers apart
+REGISTRY.gauge("app_worker_info", "Worker process serving this scrape").set(1, pid=os.getpid())
+
 # Configuration
 DB_PATH = os.environ.get("DB_PATH", os.path.join(os.getcwd(), "attendance.db"))
 BACKUP_PATH = os.path.join(os.getcwd(), "attendance_backup")
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN")  # unset -> profiling endpoint disabled
+# Empty RENDER_UPLOAD_URL disables the push (local testing)
+RENDER_UPLOAD_URL = os.environ.get("RENDER_UPLOAD_URL", "https://automatic-attendance-17.onrender.com/upload")
+DB_TIMEOUT = float(os.environ.get("DB_TIMEOUT", 10))
+MERGE_WINDOW = int(os.environ.get("MERGE_WINDOW", 30))  # seconds; closer sightings of one student are merged
+DEDUP_HISTORY = 10000  # per-device event ids kept for replay detection
+# Presence events from kiosks: "entered" starts a session; "heartbeat" and
+# "left" move the logout time of the session they fall in forward. Uploads
+# without an event are legacy sightings that alternate login and logout
+EVENT_KINDS = ('entered', 'heartbeat', 'left')
+# Central face recognition for thin kiosks (needs face_recognition/dlib installed)
+RECOGNITION_SERVICE = os.environ.get("RECOGNITION_SERVICE", "0") == "1"
 os.makedirs(BACKUP_PATH, exist_ok=True)
 
 print("[INFO] Starting Flask Attendance Server...")
@@ -29,13 +59,60 @@ def initialize_db():
                     total_hours TEXT DEFAULT '00:00:00'
                 )
             ''')
+            # Multi-kiosk ingestion: highest sequence number seen per device,
+            # and recent (device_id, seq) pairs for dropping replays
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS device_cursors (
+                    device_id TEXT PRIMARY KEY,
+                    last_seq INTEGER NOT NULL,
+                    updated TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ingested_events (
+                    device_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'applied',
+                    PRIMARY KEY (device_id, seq)
+                )
+            ''')
             conn.commit()
         print("[INFO] Database initialized successfully.")
     except Exception as e:
         print(f"[ERROR] Database initialization failed: {e}")
         raise
 
-initialize_db()
+# DB setup runs on the first request that needs it, so workers accept
+# connections (and answer /healthz) immediately after boot
+_db_ready = False
+_db_lock = threading.Lock()
+NO_DB_ROUTES = ('/healthz', '/readyz', '/metrics', '/recognize')
+
+def ensure_db():
+    global _db_ready
+    if _db_ready:
+        return
+    with _db_lock:
+        if not _db_ready:
+            initialize_db()
+            _db_ready = True
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+    if request.path not in NO_DB_ROUTES:
+        ensure_db()
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    started = getattr(g, "request_started", None)
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, route=route)
+    REQUESTS.inc(route=route, status=response.status_code)
+    return response
 
 # Fetch attendance records for homepage
 def fetch_attendance():
@@ -68,6 +145,103 @@ def index():
     print(f"[DEBUG] {len(records)} attendance records retrieved.")
     return render_template('attendance.html', attendance=records)
 
+def seconds_of_day(hms):
+    try:
+        t = datetime.strptime(hms.strip(), "%H:%M:%S")
+    except ValueError:
+        return None
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+# Places one sighting in the day's sorted login/logout list, which pairs up as
+# (login, logout) with an odd tail for a session still open. Returns the new
+# list, or None when the sighting adds nothing (merged)
+def place_time(time_list, event, current_time):
+    current_seconds = seconds_of_day(current_time)
+    seconds = [seconds_of_day(t) for t in time_list]
+    if None in seconds:
+        print(f"[WARN] Unparseable times in {time_list}; appending {current_time}")
+        return time_list + [current_time]
+    logins = seconds[0::2]
+    # Latest session starting at (or within the merge window of) this time
+    i = bisect.bisect_right(logins, current_seconds + MERGE_WINDOW) - 1
+    logout = seconds[2 * i + 1] if i >= 0 and 2 * i + 1 < len(seconds) else None
+
+    if event in (None, 'entered'):
+        # Another entrance (or a retry without seq) already saw this student,
+        # or the time falls inside a session that is already closed
+        if any(abs(sec - current_seconds) <= MERGE_WINDOW for sec in seconds):
+            return None
+        if logout is not None and current_seconds <= logout + MERGE_WINDOW:
+            return None
+    elif i >= 0:
+        # A heartbeat or leave moves the logout of the session it belongs to;
+        # one that is not past that logout (or login) adds nothing
+        if current_seconds <= (logout if logout is not None else logins[i]):
+            return None
+        return time_list[:2 * i + 1] + [current_time] + time_list[2 * i + 2:]
+
+    if i + 1 == len(logins):
+        if event == 'entered' and len(time_list) % 2:
+            # Its logout is still on its way from another kiosk: close the open
+            # session at its login (late heartbeats and leaves extend it) and
+            # start the new one
+            return time_list + [time_list[-1], current_time]
+        # After every session: opens a new one. A legacy sighting without an
+        # event closes the open one instead
+        return time_list + [current_time]
+    # A late sighting before or between sessions is a session of its own, so
+    # the later (login, logout) pairs keep their order
+    return time_list[:2 * i + 2] + [current_time, current_time] + time_list[2 * i + 2:]
+
+# Returns 'duplicate' for replays, 'conflict' when the seq is already taken by a
+# different event or is older than the retained history (the kiosk's counter
+# went backwards), otherwise records the event and advances the cursor
+def record_device_event(cursor, device_id, seq, name, timestamp):
+    cursor.execute("SELECT last_seq FROM device_cursors WHERE device_id = ?", (device_id,))
+    row = cursor.fetchone()
+    last_seq = row[0] if row else 0
+    if seq <= last_seq - DEDUP_HISTORY:
+        return 'conflict'
+
+    cursor.execute('''
+        INSERT OR IGNORE INTO ingested_events (device_id, seq, name, timestamp)
+        VALUES (?, ?, ?, ?)
+    ''', (device_id, seq, name, timestamp))
+    if cursor.rowcount == 0:
+        cursor.execute("SELECT name, timestamp FROM ingested_events WHERE device_id = ? AND seq = ?",
+                       (device_id, seq))
+        if cursor.fetchone() == (name, timestamp):
+            return 'duplicate'
+        return 'conflict'
+
+    if seq > last_seq:
+        cursor.execute('''
+            INSERT INTO device_cursors (device_id, last_seq, updated) VALUES (?, ?, ?)
+            ON CONFLICT(device_id) DO UPDATE SET last_seq = excluded.last_seq, updated = excluded.updated
+        ''', (device_id, seq, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        cursor.execute("DELETE FROM ingested_events WHERE device_id = ? AND seq <= ?",
+                       (device_id, seq - DEDUP_HISTORY))
+    return 'new'
+
+def push_to_render(data_to_push):
+    name = data_to_push["name"]
+    try:
+        render_response = requests.post(
+            RENDER_UPLOAD_URL,
+            json=data_to_push,
+            timeout=5
+        )
+        if render_response.status_code == 200:
+            RENDER_SYNC.inc(result="success")
+            print(f"[INFO] Successfully pushed attendance for {name} to Render.")
+        else:
+            RENDER_SYNC.inc(result="failure")
+            print(f"[WARN] Failed to push attendance for {name} to Render: "
+                  f"{render_response.status_code} - {render_response.text}")
+    except Exception as e:
+        RENDER_SYNC.inc(result="error")
+        print(f"[ERROR] Exception while pushing attendance to Render: {e}")
+
 # Upload attendance and push to Render
 @app.route('/upload', methods=['POST'])
 def upload_attendance():
@@ -79,9 +253,16 @@ def upload_attendance():
 
         name = data.get('name')
         timestamp = data.get('timestamp')
+        device_id = data.get('device_id')
+        seq = data.get('seq')
+        event = data.get('event')
 
         if not all([name, timestamp]):
             abort(400, description="Missing fields")
+        if device_id is not None and (not isinstance(seq, int) or isinstance(seq, bool)):
+            abort(400, description="seq must be an integer when device_id is given")
+        if event is not None and event not in EVENT_KINDS:
+            abort(400, description=f"event must be one of {', '.join(EVENT_KINDS)}")
 
         try:
             dt_obj = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
@@ -91,8 +272,27 @@ def upload_attendance():
         date = dt_obj.strftime("%Y-%m-%d")
         current_time = dt_obj.strftime("%H:%M:%S")
 
-        with sqlite3.connect(DB_PATH) as conn:
+        write_started = time.perf_counter()
+        with sqlite3.connect(DB_PATH, timeout=DB_TIMEOUT) as conn:
             cursor = conn.cursor()
+            # Take the write lock up front so concurrent kiosks cannot interleave
+            # the read-modify-write of the same row
+            lock_started = time.perf_counter()
+            cursor.execute("BEGIN IMMEDIATE")
+            DB_LOCK_WAIT_SECONDS.observe(time.perf_counter() - lock_started)
+
+            if device_id is not None:
+                outcome = record_device_event(cursor, device_id, seq, name, timestamp)
+                if outcome == 'duplicate':
+                    conn.commit()
+                    UPLOAD_RESULTS.inc(result="duplicate")
+                    return jsonify({'status': 'duplicate', 'device_id': device_id, 'seq': seq}), 200
+                if outcome == 'conflict':
+                    conn.rollback()
+                    UPLOAD_RESULTS.inc(result="seq_conflict")
+                    print(f"[WARN] Sequence went backwards for {device_id}: seq {seq} "
+                          f"({name} at {timestamp}) is already used or too old")
+                    return jsonify({'status': 'seq_conflict', 'device_id': device_id, 'seq': seq}), 409
 
             # Check if record exists for this user and date
             cursor.execute("SELECT login_logout FROM attendance WHERE name = ? AND day = ?", (name, date))
@@ -101,7 +301,15 @@ def upload_attendance():
             if result:
                 previous_times = result[0]
                 time_list = previous_times.split(", ") if previous_times.lower() != "no record" else []
-                time_list.append(current_time)
+
+                time_list = place_time(time_list, event, current_time)
+                if time_list is None:
+                    if device_id is not None:
+                        cursor.execute("UPDATE ingested_events SET status = 'merged' WHERE device_id = ? AND seq = ?",
+                                       (device_id, seq))
+                    conn.commit()
+                    UPLOAD_RESULTS.inc(result="merged")
+                    return jsonify({'status': 'merged'}), 200
 
                 # Calculate total worked hours
                 total_seconds = 0
@@ -132,6 +340,7 @@ def upload_attendance():
                 ''', (name, date, current_time, total_hours))
 
             conn.commit()
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - write_started)
 
         # Push to Render server
         data_to_push = {
@@ -141,26 +350,76 @@ def upload_attendance():
             "total_hours": total_hours
         }
 
-        try:
-            render_response = requests.post(
-                "https://automatic-attendance-17.onrender.com/upload",
-                json=data_to_push,
-                timeout=5
-            )
-            if render_response.status_code == 200:
-                print(f"[INFO] Successfully pushed attendance for {name} to Render.")
-            else:
-                print(f"[WARN] Failed to push attendance for {name} to Render: "
-                      f"{render_response.status_code} - {render_response.text}")
-        except Exception as e:
-            print(f"[ERROR] Exception while pushing attendance to Render: {e}")
+        if RENDER_UPLOAD_URL:
+            push_to_render(data_to_push)
 
+        UPLOAD_RESULTS.inc(result="success")
         return jsonify({'status': 'success'}), 200
 
+    except HTTPException:
+        raise
     except Exception as e:
+        if isinstance(e, sqlite3.OperationalError) and "locked" in str(e):
+            DB_LOCK_TIMEOUTS.inc()
+        UPLOAD_RESULTS.inc(result="error")
         print(f"[ERROR] Upload failed: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Last sequence number accepted from a kiosk, so it can resume after a restore
+@app.route('/devices/<device_id>/cursor')
+def device_cursor(device_id):
+    with sqlite3.connect(DB_PATH, timeout=DB_TIMEOUT) as conn:
+        row = conn.execute("SELECT last_seq, updated FROM device_cursors WHERE device_id = ?",
+                           (device_id,)).fetchone()
+    if not row:
+        return jsonify({'device_id': device_id, 'last_seq': 0}), 200
+    return jsonify({'device_id': device_id, 'last_seq': row[0], 'updated': row[1]}), 200
+
+# Liveness: the process is up and serving
+@app.route('/healthz')
+def healthz():
+    return jsonify({'status': 'ok'}), 200
+
+# Readiness: the database is initialised and answering queries
+@app.route('/readyz')
+def readyz():
+    try:
+        # Not run by before_request, so a database that cannot be set up
+        # answers 503 here instead of an error page
+        ensure_db()
+        with sqlite3.connect(DB_PATH, timeout=2) as conn:
+            conn.execute("SELECT 1 FROM attendance LIMIT 1")
+        return jsonify({'status': 'ready'}), 200
+    except Exception as e:
+        return jsonify({'status': 'not ready', 'error': str(e)}), 503
+
+# Prometheus scrape endpoint
+@app.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+# On-demand profile capture (CPU samples, allocations, thread stacks)
+@app.route('/debug/profile', methods=['POST'])
+def capture_profile():
+    if not PROFILE_TOKEN or request.headers.get("X-Profile-Token") != PROFILE_TOKEN:
+        abort(404)
+    try:
+        seconds = float(request.args.get("seconds", profiler.PROFILE_SECONDS))
+    except ValueError:
+        abort(400, description="seconds must be a number")
+    if math.isnan(seconds):
+        abort(400, description="seconds must be a number")
+    seconds = min(max(seconds, 1.0), 120.0)
+    prefix = profiler.start_capture("app", duration=seconds)
+    if prefix is None:
+        return jsonify({'error': 'capture already running'}), 409
+    return jsonify({'status': 'capturing', 'seconds': seconds, 'files': prefix + '.*'}), 202
+
+if RECOGNITION_SERVICE:
+    from recognition_service import recognition_bp
+    app.register_blueprint(recognition_bp)
+    print("[INFO] Recognition service enabled at /recognize")
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
@@ -0,0 +1,41 @@
+import datetime
+
+# ✅ Shared attendance row update used by the live detector (db_writer) and
+# offline batch runs, so both write the same "Login: .., Logout: .." format.
+# The caller owns the connection and decides when to commit.
+
+
+def record_attendance(cursor, name, day, now):
+    cursor.execute("SELECT login_logout FROM attendance WHERE name = ? AND day = ?", (name, day))
+    result = cursor.fetchone()
+
+    if result:
+        logs = result[0].split(", ")
+        login_time = None
+        logout_time = now
+        for entry in logs:
+            if entry.startswith("Login:"):
+                login_time = entry.split("Login: ")[-1]
+                break
+
+        if not login_time:
+            login_time = now
+
+        login_logout = f"Login: {login_time}, Logout: {logout_time}"
+        t1 = datetime.datetime.strptime(login_time, "%H:%M:%S")
+        t2 = datetime.datetime.strptime(logout_time, "%H:%M:%S")
+        total_seconds = (t2 - t1).seconds
+        total_hours = str(datetime.timedelta(seconds=total_seconds))
+
+        cursor.execute("""
+            UPDATE attendance SET login_logout = ?, total_hours = ? WHERE name = ? AND day = ?
+        """, (login_logout, total_hours, name, day))
+    else:
+        login_logout = f"Login: {now}"
+        total_hours = "00:00:00"
+        cursor.execute("""
+            INSERT INTO attendance (name, day, login_logout, total_hours)
+            VALUES (?, ?, ?, ?)
+        """, (name, day, login_logout, total_hours))
+
+    return login_logout, total_hours
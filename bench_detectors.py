@@ -0,0 +1,116 @@
+import argparse
+import json
+import time
+
+import cv2
+
+from face_detectors import create_detector
+from face_tracker import box_iou
+
+# Replays the same footage through several detector backends and reports
+# fps plus recall/precision against a reference, so each site can pick its
+# speed/accuracy trade-off:
+#   python bench_detectors.py footage.mp4 --backends hog,haar,dnn --dnn-model res10.caffemodel \
+#       --dnn-config deploy.prototxt
+# Ground truth is either an annotations file ({"<frame index>": [[top, right,
+# bottom, left], ...]}) or the boxes of a reference backend (default: hog with
+# two upsamples, slower but finds smaller faces).
+MATCH_IOU = 0.5
+
+
+def match_counts(found, truth):
+    used = set()
+    hits = 0
+    for gt in truth:
+        best, best_iou = None, MATCH_IOU
+        for i, box in enumerate(found):
+            if i in used:
+                continue
+            iou = box_iou(gt, box)
+            if iou >= best_iou:
+                best, best_iou = i, iou
+        if best is not None:
+            used.add(best)
+            hits += 1
+    return hits
+
+
+def build_backends(names, args):
+    backends = {}
+    for name in names:
+        options = {"scale": args.scale}
+        if name == "dnn":
+            options.update(model_path=args.dnn_model, config_path=args.dnn_config)
+        if name == "lbp":
+            options.update(cascade_path=args.lbp_cascade)
+        try:
+            backends[name] = create_detector(name, **options)
+        except (ValueError, ImportError, cv2.error) as e:
+            print(f"[WARN] Skipping {name}: {e}")
+    return backends
+
+
+def run(args):
+    names = [n.strip() for n in args.backends.split(",") if n.strip()]
+    backends = build_backends(names, args)
+    annotations = None
+    reference = None
+    if args.annotations:
+        with open(args.annotations) as f:
+            annotations = {int(k): [tuple(b) for b in v] for k, v in json.load(f).items()}
+    else:
+        reference = create_detector("hog", upsample=2)
+
+    stats = {name: {"seconds": 0.0, "frames": 0, "found": 0, "hits": 0} for name in backends}
+    truth_total = 0
+    capture = cv2.VideoCapture(args.video)
+    if not capture.isOpened():
+        raise SystemExit(f"[ERROR] Cannot open video: {args.video}")
+
+    index = -1
+    evaluated = 0
+    while args.max_frames is None or evaluated < args.max_frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        index += 1
+        if index % args.stride:
+            continue
+        evaluated += 1
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        truth = annotations.get(index, []) if annotations is not None else reference.detect(rgb)
+        truth_total += len(truth)
+
+        for name, backend in backends.items():
+            started = time.perf_counter()
+            found = backend.detect(rgb)
+            s = stats[name]
+            s["seconds"] += time.perf_counter() - started
+            s["frames"] += 1
+            s["found"] += len(found)
+            s["hits"] += match_counts(found, truth)
+    capture.release()
+
+    source = "annotations" if annotations is not None else "hog x2 upsample reference"
+    print(f"[INFO] Frames evaluated: {evaluated}  ground-truth faces: {truth_total} ({source})")
+    print(f"{'backend':<8}{'fps':>8}{'ms/frame':>10}{'recall':>9}{'precision':>11}")
+    for name, s in stats.items():
+        fps = s["frames"] / s["seconds"] if s["seconds"] else 0.0
+        ms = 1000.0 * s["seconds"] / s["frames"] if s["frames"] else 0.0
+        recall = s["hits"] / truth_total if truth_total else 0.0
+        precision = s["hits"] / s["found"] if s["found"] else 0.0
+        print(f"{name:<8}{fps:>8.1f}{ms:>10.1f}{recall:>9.3f}{precision:>11.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare face detector backends on recorded footage")
+    parser.add_argument("video")
+    parser.add_argument("--backends", default="hog,haar,dnn")
+    parser.add_argument("--annotations", help="JSON ground truth per frame index")
+    parser.add_argument("--dnn-model")
+    parser.add_argument("--dnn-config")
+    parser.add_argument("--lbp-cascade")
+    parser.add_argument("--scale", type=float, default=1.0, help="downscale factor for all backends")
+    parser.add_argument("--stride", type=int, default=1, help="evaluate every Nth frame")
+    parser.add_argument("--max-frames", type=int, default=None)
+    run(parser.parse_args())
@@ -0,0 +1,94 @@
+import argparse
+import pickle
+import time
+
+import numpy as np
+
+from gallery import Gallery, GALLERY_FORMATS, load_gallery
+
+# Accuracy, memory and latency report for the compact gallery formats.
+# Match decisions at TOLERANCE are compared against the float64 reference;
+# any flip must sit within the format's stated error bound of TOLERANCE.
+#   python bench_gallery.py --students 20000 --queries 2000
+#   python bench_gallery.py --encodings encodings.pickle
+TOLERANCE = 0.55
+
+
+def synthetic_gallery(students, queries, seed):
+    # dlib encodings have per-dimension spread of roughly 0.09 (unit-ish norm);
+    # queries are noisy copies of members, spread so distances straddle TOLERANCE
+    rng = np.random.default_rng(seed)
+    encodings = rng.normal(0.0, 0.09, size=(students, 128))
+    owners = rng.integers(0, students, size=queries)
+    noise = rng.normal(size=(queries, 128))
+    noise /= np.linalg.norm(noise, axis=1, keepdims=True)
+    noise *= rng.uniform(0.2, 0.9, size=(queries, 1))
+    return encodings, encodings[owners] + noise
+
+
+def pickle_gallery(path, queries, seed):
+    # Decodes int8 / float16 pickles written by encode_faces.py; the
+    # reference is then the best available reconstruction of the stored gallery
+    with open(path, "rb") as f:
+        encodings = load_gallery(pickle.load(f), "float64").decode()
+    rng = np.random.default_rng(seed)
+    owners = rng.integers(0, len(encodings), size=queries)
+    noise = rng.normal(size=(queries, 128))
+    noise *= rng.uniform(0.2, 0.9, size=(queries, 1)) / np.linalg.norm(noise, axis=1, keepdims=True)
+    return encodings, encodings[owners] + noise
+
+
+def evaluate(gallery, queries):
+    best_index = np.empty(len(queries), dtype=np.int64)
+    best_dist = np.empty(len(queries))
+    started = time.perf_counter()
+    for i, q in enumerate(queries):
+        best_index[i], best_dist[i] = gallery.best_match(q)
+    per_query = (time.perf_counter() - started) / len(queries)
+    return best_index, best_dist, per_query
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact gallery accuracy / memory / latency report")
+    parser.add_argument("--encodings", help="use a real encodings.pickle instead of synthetic data")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.encodings:
+        encodings, queries = pickle_gallery(args.encodings, args.queries, args.seed)
+    else:
+        encodings, queries = synthetic_gallery(args.students, args.queries, args.seed)
+    names = [f"s{i}" for i in range(len(encodings))]
+
+    reference = Gallery.from_encodings(encodings, names, "float64")
+    ref_index, ref_dist, _ = evaluate(reference, queries)
+    ref_accept = ref_dist < TOLERANCE
+    sample = queries[: min(len(queries), 200)]
+    ref_all = reference.distances_batch(sample)
+    query_norm = float(np.linalg.norm(queries, axis=1).max())
+
+    # What detect_faces() used to do: face_recognition.face_distance on a list of float64 arrays
+    started = time.perf_counter()
+    for q in queries:
+        np.linalg.norm(encodings - q, axis=1).argmin()
+    legacy_us = (time.perf_counter() - started) / len(queries) * 1e6
+
+    print(f"[INFO] Gallery: {len(encodings)} students, {len(queries)} queries, TOLERANCE={TOLERANCE}")
+    print(f"[INFO] Legacy face_distance: {legacy_us:.1f} us/query, {encodings.nbytes / len(encodings):.0f} B/student")
+    print(f"{'format':<9}{'B/student':>10}{'gallery MB':>11}{'us/query':>10}{'max |dd|':>10}"
+          f"{'bound':>9}{'decisions':>11}{'flips':>7}{'flips>bound':>12}")
+    for fmt in GALLERY_FORMATS:
+        gallery = Gallery.from_encodings(encodings, names, fmt)
+        index, dist, per_query = evaluate(gallery, queries)
+        accept = dist < TOLERANCE
+        # A decision matches when accept/reject agrees and accepted identities agree
+        same = (accept == ref_accept) & (~ref_accept | (index == ref_index))
+        flips = np.flatnonzero(~same)
+        bound = gallery.error_bound(TOLERANCE, query_norm)
+        outside = int(np.sum(np.abs(ref_dist[flips] - TOLERANCE) > bound)) if len(flips) else 0
+        max_err = float(np.abs(gallery.distances_batch(sample) - ref_all).max())
+        per_student = gallery.memory_bytes() / len(encodings)
+        print(f"{fmt:<9}{per_student:>10.0f}{gallery.memory_bytes() / 1e6:>11.2f}{per_query * 1e6:>10.1f}"
+              f"{max_err:>10.5f}{bound:>9.5f}{100.0 * same.mean():>10.2f}%{len(flips):>7}{outside:>12}")
@@ -0,0 +1,150 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+# Simulates many kiosks posting to /upload in-process (Flask test client) and
+# checks that replays are dropped and overlapping sightings are merged.
+# Each visit is an entered / heartbeat ... / left sequence from 1..overlap
+# entrances. Late devices come back online after everyone else has posted and
+# deliver their backlog: sightings from a second entrance in the middle of a
+# visit, and jittered copies of whole visits.
+# The Render push is disabled so only the server's own path is measured.
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(prefix="ingest_"), "attendance.db"))
+os.environ["RENDER_UPLOAD_URL"] = ""
+
+from app import app, DB_PATH, MERGE_WINDOW, seconds_of_day  # noqa: E402
+from presence import HEARTBEAT_INTERVAL  # noqa: E402
+
+JITTER = min(5, MERGE_WINDOW)  # seconds between entrances seeing the same moment
+MID_VISIT_RATE = 0.3           # visits also seen mid-way by a late device's entrance
+LATE_COPY_RATE = 0.2           # visits a late device replays in full
+
+
+def visit_events(rng, start, end):
+    # One kiosk's presence events for a visit, jittered
+    at = start + rng.randint(0, JITTER)
+    events = [(at, "entered")]
+    for beat in range(at + int(HEARTBEAT_INTERVAL), end, int(HEARTBEAT_INTERVAL)):
+        events.append((beat, "heartbeat"))
+    events.append((end + rng.randint(0, JITTER), "left"))
+    return events
+
+
+def build_schedule(devices, late, students, visits, overlap, seed):
+    # -> (per device events, late device ids, expected seconds per student)
+    rng = random.Random(seed)
+    per_device = {f"kiosk-{d:02d}": [] for d in range(devices)}
+    device_ids = list(per_device)
+    on_time, late_ids = device_ids[:devices - late], device_ids[devices - late:]
+    expected = {}
+    day_start, window = 8 * 3600, 9 * 3600 // visits
+    for s in range(students):
+        name = f"Student{s:03d}"
+        expected[name] = 0
+        # Visits are spaced well beyond MERGE_WINDOW so each is a real session
+        for v in range(visits):
+            start = day_start + v * window + rng.randint(0, window // 4)
+            end = start + rng.randint(600, window // 2)
+            expected[name] += end - start
+            for device_id in rng.sample(on_time, rng.randint(1, min(overlap, len(on_time)))):
+                per_device[device_id].extend((at, name, kind) for at, kind in visit_events(rng, start, end))
+            if late_ids and rng.random() < MID_VISIT_RATE:
+                at = rng.randint(start + 60, end - 120)
+                per_device[rng.choice(late_ids)].extend([(at, name, "entered"), (at + 60, name, "left")])
+            if late_ids and rng.random() < LATE_COPY_RATE:
+                per_device[rng.choice(late_ids)].extend(
+                    (at, name, kind) for at, kind in visit_events(rng, start, end))
+    for events in per_device.values():
+        events.sort()
+    return per_device, late_ids, expected
+
+
+def fmt(seconds):
+    return f"2025-01-15 {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def run_device(device_id, events, replay_rate, seed, results, latencies, lock):
+    rng = random.Random(seed)
+    client = app.test_client()
+    local = {}
+    local_latencies = []
+    for seq, (t, name, kind) in enumerate(events, start=1):
+        payload = {"name": name, "timestamp": fmt(t), "device_id": device_id, "seq": seq, "event": kind}
+        attempts = 2 if rng.random() < replay_rate else 1
+        for _ in range(attempts):
+            started = time.perf_counter()
+            response = client.post("/upload", json=payload)
+            local_latencies.append(time.perf_counter() - started)
+            status = response.get_json().get("status", f"http {response.status_code}")
+            local[status] = local.get(status, 0) + 1
+    with lock:
+        for status, count in local.items():
+            results[status] = results.get(status, 0) + count
+        latencies.extend(local_latencies)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-kiosk ingestion load test")
+    parser.add_argument("--devices", type=int, default=32)
+    parser.add_argument("--late", type=int, default=4, help="devices that deliver their backlog last")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--visits", type=int, default=4, help="sessions per student per day")
+    parser.add_argument("--overlap", type=int, default=3, help="max entrances seeing one visit")
+    parser.add_argument("--replay-rate", type=float, default=0.2, help="fraction of POSTs retried")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    if not 0 <= args.late < args.devices:
+        parser.error("--late must be below --devices")
+
+    schedule, late_ids, expected = build_schedule(args.devices, args.late, args.students, args.visits,
+                                                  args.overlap, args.seed)
+    results = {}
+    latencies = []
+    lock = threading.Lock()
+    threads = {device_id: threading.Thread(target=run_device,
+                                           args=(device_id, events, args.replay_rate, args.seed + i,
+                                                 results, latencies, lock))
+               for i, (device_id, events) in enumerate(schedule.items())}
+
+    started = time.perf_counter()
+    # Late devices start once every on-time device has posted everything
+    for wave in ([d for d in threads if d not in late_ids], late_ids):
+        for device_id in wave:
+            threads[device_id].start()
+        for device_id in wave:
+            threads[device_id].join()
+    wall = time.perf_counter() - started
+
+    with sqlite3.connect(DB_PATH) as conn:
+        rows = conn.execute("SELECT name, login_logout, total_hours FROM attendance").fetchall()
+        cursors = dict(conn.execute("SELECT device_id, last_seq FROM device_cursors").fetchall())
+
+    expected_times = args.students * args.visits * 2
+    recorded_times = sum(len(times.split(", ")) for _, times, _ in rows)
+    cursor_ok = all(cursors.get(d) == len(events) for d, events in schedule.items() if events)
+    # Login and logout may each come from any entrance that saw them
+    slack = args.visits * 2 * JITTER
+    off = [name for name, _, hours in rows
+           if abs(seconds_of_day(hours) - expected[name]) > slack]
+
+    print(f"[INFO] Devices: {args.devices} ({len(late_ids)} late)"
+          f"  events: {sum(len(e) for e in schedule.values())}"
+          f"  requests: {len(latencies)}  wall: {wall:.2f}s")
+    print(f"[INFO] Throughput: {len(latencies) / wall:.1f} req/s")
+    print(f"[INFO] Latency ms  p50: {percentile(latencies, 50) * 1000:.2f}"
+          f"  p95: {percentile(latencies, 95) * 1000:.2f}  p99: {percentile(latencies, 99) * 1000:.2f}")
+    print(f"[INFO] Outcomes: {results}")
+    print(f"[INFO] Times recorded: {recorded_times} (expected {expected_times}, a login and logout per visit)")
+    print(f"[INFO] Students with total hours off by more than {slack}s: {len(off)}")
+    print(f"[INFO] Device cursors match last seq: {cursor_ok}")
+    if recorded_times != expected_times or off or not cursor_ok:
+        raise SystemExit("[ERROR] Ingestion check failed")
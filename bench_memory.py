@@ -0,0 +1,117 @@
+import argparse
+import gc
+import random
+import time
+
+import cv2
+import face_recognition
+
+from frame_buffers import FrameBuffers, tune_gc
+
+# Replays footage in a loop for a fixed wall time and records RSS and
+# per-frame latency. Run once per mode and compare:
+#   python bench_memory.py footage.mp4 --mode legacy --minutes 120
+#   python bench_memory.py footage.mp4 --mode reuse  --minutes 120
+# Latencies go into a fixed-size reservoir so the benchmark's own bookkeeping
+# does not show up as RSS growth.
+RESERVOIR_SIZE = 20000
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(video_path, mode, minutes, sample_every, detect, encode, csv_path):
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise SystemExit(f"[ERROR] Cannot open video: {video_path}")
+
+    buffers = FrameBuffers() if mode == "reuse" else None
+    if mode == "reuse":
+        tune_gc()
+
+    latencies = []
+    rng = random.Random(0)
+    rss_samples = []
+    frames = 0
+    start = time.monotonic()
+    deadline = start + minutes * 60
+    next_sample = start
+
+    while time.monotonic() < deadline:
+        t0 = time.perf_counter()
+        if buffers:
+            ret, frame = buffers.read(capture)
+        else:
+            ret, frame = capture.read()
+        if not ret:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+
+        rgb = buffers.to_rgb() if buffers else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if detect:
+            locations = face_recognition.face_locations(rgb)
+            if encode and locations:
+                face_recognition.face_encodings(rgb, locations)
+        if mode == "legacy":
+            gc.collect()
+        elapsed = time.perf_counter() - t0
+        frames += 1
+        if len(latencies) < RESERVOIR_SIZE:
+            latencies.append(elapsed)
+        else:
+            slot = rng.randrange(frames)
+            if slot < RESERVOIR_SIZE:
+                latencies[slot] = elapsed
+
+        now = time.monotonic()
+        if now >= next_sample:
+            rss_samples.append((now - start, rss_mb()))
+            next_sample = now + sample_every
+
+    capture.release()
+    rss_samples.append((time.monotonic() - start, rss_mb()))
+
+    if csv_path:
+        with open(csv_path, "w") as f:
+            f.write("elapsed_s,rss_mb\n")
+            for elapsed, rss in rss_samples:
+                f.write(f"{elapsed:.1f},{rss:.1f}\n")
+
+    # Ignore the warm-up tenth of the run when judging growth
+    steady = rss_samples[len(rss_samples) // 10:]
+    rss_values = [rss for _, rss in steady]
+    print(f"[INFO] Mode: {mode}  frames: {frames}  wall: {minutes:.1f} min")
+    print(f"[INFO] Frame latency ms  p50: {percentile(latencies, 50) * 1000:.2f}"
+          f"  p95: {percentile(latencies, 95) * 1000:.2f}"
+          f"  p99: {percentile(latencies, 99) * 1000:.2f}")
+    print(f"[INFO] RSS MB  start: {steady[0][1]:.1f}  end: {steady[-1][1]:.1f}"
+          f"  min: {min(rss_values):.1f}  max: {max(rss_values):.1f}")
+    if buffers:
+        print(f"[INFO] Buffer reallocations: {buffers.reallocations}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory and latency benchmark for the frame loop")
+    parser.add_argument("video", help="recorded footage, replayed in a loop")
+    parser.add_argument("--mode", choices=("legacy", "reuse"), default="reuse")
+    parser.add_argument("--minutes", type=float, default=60.0)
+    parser.add_argument("--sample-every", type=float, default=30.0, help="seconds between RSS samples")
+    parser.add_argument("--no-detect", action="store_true", help="only read + convert")
+    parser.add_argument("--no-encode", action="store_true")
+    parser.add_argument("--csv", help="write RSS samples to this file")
+    args = parser.parse_args()
+    run(args.video, args.mode, args.minutes, args.sample_every,
+        not args.no_detect, not args.no_encode, args.csv)
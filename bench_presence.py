@@ -0,0 +1,80 @@
+import argparse
+import random
+
+from presence import PresenceEngine
+
+# Simulates a classroom day of recognised sightings and counts how many DB
+# writes + uploads each policy would trigger. Every write in the detector is
+# one UPDATE/INSERT plus one HTTP POST, so writes == sync requests.
+LEGACY_DEBOUNCE = 10.0
+
+
+def simulate_sightings(students, hours, fps, dropout, breaks, seed):
+    rng = random.Random(seed)
+    events = []
+    duration = hours * 3600
+    for i in range(students):
+        name = f"student{i:03d}"
+        # Each student arrives a little late and takes a few breaks out of view
+        t = rng.uniform(0, 600)
+        away = sorted(rng.uniform(t, duration) for _ in range(breaks))
+        step = 1.0 / fps
+        while t < duration:
+            if away and t >= away[0]:
+                t += rng.uniform(120, 900)
+                away.pop(0)
+                continue
+            if rng.random() > dropout:
+                events.append((t, name))
+            t += step
+    events.sort()
+    return events
+
+
+def legacy_writes(sightings):
+    last_seen = {}
+    writes = 0
+    for now, name in sightings:
+        if name not in last_seen or now - last_seen[name] > LEGACY_DEBOUNCE:
+            last_seen[name] = now
+            writes += 1
+    return writes, len(last_seen)
+
+
+def presence_writes(sightings):
+    engine = PresenceEngine()
+    writes = 0
+    peak_states = 0
+    next_sweep = 0.0
+    now = 0.0
+    for now, name in sightings:
+        writes += len(engine.observe(name, now))
+        if now >= next_sweep:
+            writes += len(engine.sweep(now))
+            next_sweep = now + 1.0
+        peak_states = max(peak_states, len(engine.states))
+    writes += len(engine.sweep(now + engine.leave_after + 1))
+    return writes, peak_states, engine.counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare presence engine with the 10 s debounce")
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--hours", type=float, default=1.0)
+    parser.add_argument("--fps", type=float, default=5.0, help="recognised sightings per second")
+    parser.add_argument("--dropout", type=float, default=0.2, help="fraction of missed sightings")
+    parser.add_argument("--breaks", type=int, default=2, help="times each student leaves the view")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    sightings = simulate_sightings(args.students, args.hours, args.fps,
+                                   args.dropout, args.breaks, args.seed)
+    old, old_states = legacy_writes(sightings)
+    new, peak_states, counts = presence_writes(sightings)
+
+    print(f"[INFO] Sightings simulated: {len(sightings)}")
+    print(f"[INFO] 10 s debounce: {old} writes + {old} uploads, {old_states} last_seen entries (never evicted)")
+    print(f"[INFO] Presence engine: {new} writes + {new} uploads, peak state size {peak_states}")
+    print(f"[INFO]   entered={counts['entered']} heartbeat={counts['heartbeat']} left={counts['left']}")
+    if new:
+        print(f"[INFO] Write/sync volume reduced {old / new:.1f}x ({100.0 * (old - new) / old:.1f}% fewer)")
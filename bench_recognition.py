@@ -0,0 +1,163 @@
+import argparse
+import os
+import pickle
+import threading
+import time
+
+import cv2
+import face_recognition
+import numpy as np
+import requests
+from flask import Flask
+
+import recognition_service
+from gallery import load_gallery
+from recognition_client import encode_face
+from recognition_service import RecognitionService, recognition_bp
+
+# Simulated kiosks against the central recognition service. Each device sends
+# one request (--faces JPEG crops) every 1/--rate seconds; the report shows
+# batch sizes, queue wait, latency and throughput as the device count grows,
+# once per --max-batch setting (1 = no batching, for comparison).
+#   python bench_recognition.py --devices 1,4,16,32 --max-batch 1,32
+#   python bench_recognition.py --url http://server:5000/recognize --devices 8,16
+IMAGES_DIR = "images"
+
+
+def load_faces(images_dir, limit):
+    faces = []
+    for name in sorted(os.listdir(images_dir)):
+        if not name.lower().endswith((".jpg", ".jpeg", ".png")):
+            continue
+        image = cv2.imread(os.path.join(images_dir, name))
+        if image is None:
+            continue
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        for box in face_recognition.face_locations(rgb):
+            faces.append(encode_face(image, box))
+    if not faces:
+        raise SystemExit(f"[ERROR] No faces found in {images_dir}")
+    return faces[:limit] if limit else faces
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def device(index, post, faces, per_request, rate, deadline, samples, lock):
+    period = 1.0 / rate
+    # Spread the first requests so devices do not start in lockstep
+    next_at = time.monotonic() + period * (index % 97) / 97.0
+    sent = 0
+    while True:
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if time.monotonic() >= deadline:
+            break
+        body = {"device_id": f"kiosk-{index}",
+                "faces": [faces[(index + sent + i) % len(faces)] for i in range(per_request)]}
+        started = time.monotonic()
+        status, data = post(body)
+        latency = time.monotonic() - started
+        with lock:
+            samples.append((status, latency, data))
+        sent += 1
+        next_at += period
+
+
+def run(post, devices, faces, per_request, rate, duration):
+    samples, lock = [], threading.Lock()
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    threads = [threading.Thread(target=device, args=(i, post, faces, per_request, rate, deadline, samples, lock))
+               for i in range(devices)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.monotonic() - started
+
+    ok = [(latency, data) for status, latency, data in samples if status == 200]
+    batches = [data["batch_size"] for _, data in ok]
+    waits = [data["queue_ms"] for _, data in ok]
+    latencies = [latency * 1000.0 for latency, _ in ok]
+    return {"devices": devices, "sent": len(samples), "ok": len(ok), "rejected": len(samples) - len(ok),
+            "crops_s": len(ok) * per_request / wall, "batch_mean": float(np.mean(batches)) if batches else 0.0,
+            "batch_p95": percentile(batches, 95), "wait_p50": percentile(waits, 50),
+            "wait_p95": percentile(waits, 95), "lat_p50": percentile(latencies, 50),
+            "lat_p95": percentile(latencies, 95), "lat_p99": percentile(latencies, 99)}
+
+
+def local_poster(service):
+    # In-process: full JSON + JPEG decode path through the Flask blueprint
+    app = Flask(__name__)
+    app.register_blueprint(recognition_bp)
+    recognition_service._service = service
+    local = threading.local()
+
+    def post(body):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        response = client.post("/recognize", json=body)
+        return response.status_code, response.get_json()
+    return post
+
+
+def remote_poster(url, timeout):
+    local = threading.local()
+
+    def post(body):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        try:
+            response = session.post(url, json=body, timeout=timeout)
+            return response.status_code, response.json() if response.status_code == 200 else None
+        except requests.RequestException:
+            return 0, None
+    return post
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched recognition service load report")
+    parser.add_argument("--url", help="target a running service instead of an in-process one")
+    parser.add_argument("--encodings", default="encodings.pickle")
+    parser.add_argument("--images", default=IMAGES_DIR, help="photos to cut face crops from")
+    parser.add_argument("--devices", default="1,4,16,32")
+    parser.add_argument("--max-batch", default="1,32", help="in-process batch limits to compare")
+    parser.add_argument("--max-wait-ms", type=float, default=recognition_service.MAX_WAIT * 1000.0)
+    parser.add_argument("--rate", type=float, default=1.0, help="requests per second per device")
+    parser.add_argument("--faces", type=int, default=1, help="crops per request")
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    faces = load_faces(args.images, None)
+    size = sum(len(f["jpeg"]) for f in faces) / len(faces)
+    print(f"[INFO] {len(faces)} face crops, {size / 1024:.1f} KiB base64 JPEG each on average")
+
+    if args.url:
+        configs = [("remote", remote_poster(args.url, recognition_service.TIMEOUT + 1.0))]
+    else:
+        with open(args.encodings, "rb") as f:
+            gallery = load_gallery(pickle.load(f))
+        configs = []
+        for max_batch in (int(v) for v in args.max_batch.split(",")):
+            configs.append((f"batch<={max_batch}", max_batch))
+
+    print(f"{'config':<11}{'devices':>8}{'sent':>6}{'ok':>6}{'503':>5}{'crops/s':>9}{'batch':>7}"
+          f"{'b p95':>7}{'wait p50':>9}{'wait p95':>9}{'lat p50':>9}{'lat p95':>9}{'lat p99':>9}")
+    for label, config in configs:
+        for devices in (int(v) for v in args.devices.split(",")):
+            if args.url:
+                post = config
+            else:
+                service = RecognitionService(gallery, max_batch=config, max_wait=args.max_wait_ms / 1000.0).start()
+                post = local_poster(service)
+                # Warm the models outside the measurement
+                post({"faces": faces[:1]})
+            r = run(post, devices, faces, args.faces, args.rate, args.duration)
+            print(f"{label:<11}{r['devices']:>8}{r['sent']:>6}{r['ok']:>6}{r['rejected']:>5}{r['crops_s']:>9.1f}"
+                  f"{r['batch_mean']:>7.1f}{r['batch_p95']:>7.0f}{r['wait_p50']:>9.1f}{r['wait_p95']:>9.1f}"
+                  f"{r['lat_p50']:>9.1f}{r['lat_p95']:>9.1f}{r['lat_p99']:>9.1f}")
@@ -0,0 +1,133 @@
+import argparse
+import pickle
+import time
+from collections import Counter
+
+import cv2
+import face_recognition
+
+from face_detectors import create_detector
+from face_tracker import FaceTracker
+from gallery import load_gallery
+from scheduler import FrameScheduler
+
+# Replays footage as a live camera (the frame served is the one the camera
+# would show at that moment) through the detect/track/encode loop, once with
+# the old fixed 0.1 s sleep and once with the adaptive scheduler, and compares
+# process CPU, frames processed with and without faces in view, and how late
+# each arrival is first detected.
+#   python bench_scheduler.py lobby.mp4 --encodings encodings.pickle
+TOLERANCE = 0.55
+ARRIVAL_GAP = 5.0  # seconds without detections before a detection counts as a new arrival
+
+
+class ReplayCamera:
+    def __init__(self, path, max_seconds=None):
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise SystemExit(f"[ERROR] Cannot open video: {path}")
+        self.fps = capture.get(cv2.CAP_PROP_FPS) or 10.0
+        # Kept JPEG-encoded so skipped frames cost nothing, like a camera
+        # dropping frames nobody read
+        self.frames = []
+        while max_seconds is None or len(self.frames) < max_seconds * self.fps:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            self.frames.append(cv2.imencode(".jpg", frame)[1])
+        capture.release()
+        self.started = None
+
+    def start(self):
+        self.started = time.monotonic()
+
+    def read(self):
+        # -> (frame, video time) or (None, None) at the end
+        index = int((time.monotonic() - self.started) * self.fps)
+        if index >= len(self.frames):
+            return None, None
+        return cv2.imdecode(self.frames[index], cv2.IMREAD_COLOR), index / self.fps
+
+
+def process(frame, detector, tracker, gallery):
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    locations = detector.detect(rgb)
+    for track in tracker.update(locations):
+        if not track.needs_verification():
+            tracker.reuse(track)
+            continue
+        encoding = face_recognition.face_encodings(rgb, [track.box])
+        if not encoding:
+            continue
+        best_match, distance = gallery.best_match(encoding[0])
+        tracker.verify(track, gallery.names[best_match] if best_match is not None and distance < TOLERANCE
+                       else "Unknown", distance)
+    return len(locations)
+
+
+def run(mode, camera, detector, gallery):
+    tracker = FaceTracker(tolerance=TOLERANCE)
+    scheduler = FrameScheduler() if mode == "adaptive" else None
+    detections, reasons = [], Counter()
+    frames = with_faces = 0
+    camera.start()
+    cpu_started, wall_started = time.process_time(), time.monotonic()
+    while True:
+        if scheduler:
+            scheduler.begin()
+        frame, at = camera.read()
+        if frame is None:
+            break
+        faces = process(frame, detector, tracker, gallery)
+        frames += 1
+        if faces:
+            with_faces += 1
+            detections.append(at)
+        if scheduler:
+            delay = scheduler.end(faces)
+            reasons[scheduler.reason] += 1
+            time.sleep(delay)
+        else:
+            time.sleep(0.1)
+    cpu = time.process_time() - cpu_started
+    wall = time.monotonic() - wall_started
+    return {"mode": mode, "frames": frames, "with_faces": with_faces, "cpu": cpu, "wall": wall,
+            "arrivals": arrivals(detections), "reasons": reasons, "encodes": tracker.encodes}
+
+
+def arrivals(detections):
+    found, last = [], None
+    for at in detections:
+        if last is None or at - last >= ARRIVAL_GAP:
+            found.append(at)
+        last = at
+    return found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fixed sleep vs adaptive frame scheduler on replayed footage")
+    parser.add_argument("video")
+    parser.add_argument("--encodings", default="encodings.pickle")
+    parser.add_argument("--detector", default=None, help="hog|haar|lbp|dnn (default: FACE_DETECTOR)")
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    with open(args.encodings, "rb") as f:
+        gallery = load_gallery(pickle.load(f))
+    detector = create_detector(args.detector)
+    camera = ReplayCamera(args.video, args.max_seconds)
+    print(f"[INFO] {len(camera.frames)} frames @ {camera.fps:.1f} fps "
+          f"({len(camera.frames) / camera.fps:.0f} s), detector {detector.name}")
+
+    results = [run(mode, camera, detector, gallery) for mode in ("fixed", "adaptive")]
+    print(f"{'mode':<10}{'frames':>7}{'w/ faces':>9}{'no face':>8}{'encodes':>8}{'CPU s':>8}{'CPU %':>7}  first detections (s)")
+    for r in results:
+        print(f"{r['mode']:<10}{r['frames']:>7}{r['with_faces']:>9}{r['frames'] - r['with_faces']:>8}"
+              f"{r['encodes']:>8}{r['cpu']:>8.1f}{100.0 * r['cpu'] / r['wall']:>6.0f}%  "
+              + ", ".join(f"{at:.1f}" for at in r["arrivals"]))
+    fixed, adaptive = results
+    print(f"[INFO] CPU saved: {100.0 * (1.0 - adaptive['cpu'] / fixed['cpu']):.0f}%")
+    delays = [a - f for f, a in zip(fixed["arrivals"], adaptive["arrivals"])]
+    if delays and len(fixed["arrivals"]) == len(adaptive["arrivals"]):
+        print("[INFO] Extra detection delay per arrival: " + ", ".join(f"{d:+.1f} s" for d in delays))
+    print(f"[INFO] Adaptive frames by deciding factor: {dict(adaptive['reasons'])}")
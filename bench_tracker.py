@@ -0,0 +1,81 @@
+import argparse
+import pickle
+import time
+
+import cv2
+import face_recognition
+
+from face_tracker import FaceTracker, OpticalFlowTracker
+from gallery import load_gallery
+
+# Replays recorded footage and compares encode calls per second between the
+# old loop (encode every detected face, every frame) and the tracker loop.
+TOLERANCE = 0.55
+
+
+def run(video_path, encodings_path, optical_flow=False, max_frames=None):
+    with open(encodings_path, "rb") as f:
+        gallery = load_gallery(pickle.load(f))
+
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise SystemExit(f"[ERROR] Cannot open video: {video_path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+
+    tracker = FaceTracker(OpticalFlowTracker() if optical_flow else None, TOLERANCE)
+    frames = 0
+    baseline_encodes = 0
+    encode_seconds = 0.0
+    start = time.perf_counter()
+
+    while max_frames is None or frames < max_frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames += 1
+
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        locations = face_recognition.face_locations(rgb)
+        baseline_encodes += len(locations)
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if optical_flow else None
+        for track in tracker.update(locations, gray, now=frames / fps):
+            if not track.needs_verification():
+                tracker.reuse(track)
+                continue
+            t0 = time.perf_counter()
+            encoding = face_recognition.face_encodings(rgb, [track.box])
+            encode_seconds += time.perf_counter() - t0
+            if not encoding:
+                continue
+            best_match, distance = gallery.best_match(encoding[0])
+            if best_match is not None and distance < TOLERANCE:
+                tracker.verify(track, gallery.names[best_match], distance)
+            else:
+                tracker.verify(track, "Unknown", distance)
+
+    wall = time.perf_counter() - start
+    capture.release()
+
+    video_seconds = frames / fps
+    per_encode = encode_seconds / tracker.encodes if tracker.encodes else 0.0
+    print(f"[INFO] Frames replayed: {frames} ({video_seconds:.1f} s of video, {wall:.1f} s wall)")
+    print(f"[INFO] Encode calls  baseline: {baseline_encodes}  tracker: {tracker.encodes}"
+          f"  reused: {tracker.reuses}")
+    if video_seconds:
+        print(f"[INFO] Encodes/s     baseline: {baseline_encodes / video_seconds:.2f}"
+              f"  tracker: {tracker.encodes / video_seconds:.2f}")
+    if tracker.encodes:
+        print(f"[INFO] Reduction: {baseline_encodes / tracker.encodes:.1f}x fewer encodes")
+        print(f"[INFO] Encode time  tracker: {encode_seconds:.2f} s"
+              f"  baseline (est.): {per_encode * baseline_encodes:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the cross-frame face tracker")
+    parser.add_argument("video", help="recorded footage to replay")
+    parser.add_argument("--encodings", default="encodings.pickle")
+    parser.add_argument("--optical-flow", action="store_true")
+    parser.add_argument("--max-frames", type=int, default=None)
+    args = parser.parse_args()
+    run(args.video, args.encodings, args.optical_flow, args.max_frames)
@@ -1,5 +1,4 @@
 import cv2
-import face_recognition
 import pickle
 import datetime
 import gc
@@ -8,10 +7,46 @@ import time
 import threading
 import requests
 import sqlite3
-from queue import Queue
+import os
+from queue import Queue, Empty
+from collections import deque
+from face_tracker import FaceTracker, OpticalFlowTracker
+from presence import PresenceEngine
+from metrics import REGISTRY, start_device_exporter
+from profiler import install_signal_trigger
+from frame_buffers import FrameBuffers, tune_gc
+from readiness import Readiness
+from device_identity import DEVICE_ID, SequenceCounter
+from face_detectors import create_detector
+from gallery import load_gallery
+from attendance_store import record_attendance
+from recognition_client import RecognitionClient
+from scheduler import FrameScheduler
+
+# ✅ Metrics
+STAGE_SECONDS = REGISTRY.histogram("detector_stage_seconds", "Time spent per detect_faces() stage")
+FRAMES = REGISTRY.counter("detector_frames_total", "Frames processed by the detector")
+FACES = REGISTRY.counter("detector_faces_total", "Faces located by the detector")
+ENCODES = REGISTRY.counter("detector_encodes_total", "Face encodings computed")
+QUEUE_DEPTH = REGISTRY.gauge("attendance_queue_depth", "Pending attendance writes")
+DB_COMMIT_SECONDS = REGISTRY.histogram("db_writer_commit_seconds", "Attendance write + commit latency")
+SYNC_RESULTS = REGISTRY.counter("sync_requests_total", "Uploads to the public server by result")
+UNSENT = REGISTRY.gauge("sync_unsent_events", "Attendance events waiting to be retried")
 
 # ✅ Server URL
 PUBLIC_SERVER_URL = "https://automatic-attendance-17.onrender.com/upload"
+# A lost sequence file resumes above the server's cursor for this kiosk
+CURSOR_URL = PUBLIC_SERVER_URL.rsplit("/upload", 1)[0] + f"/devices/{requests.utils.quote(DEVICE_ID)}/cursor"
+sequence = SequenceCounter(cursor_url=CURSOR_URL)
+# Failed uploads are retried in order with the same seq (the server drops the
+# replay if an earlier attempt did land), oldest dropped past SYNC_MAX_UNSENT
+SYNC_RETRY_SECONDS = float(os.environ.get("SYNC_RETRY_SECONDS", 30))
+SYNC_MAX_UNSENT = int(os.environ.get("SYNC_MAX_UNSENT", 10000))
+# Thin-kiosk mode: send face crops to a central recognition service instead
+# of encoding locally. No local gallery, and no dlib at all with the default
+# OpenCV detector for this mode (FACE_DETECTOR=hog would load dlib again)
+RECOGNITION_SERVER_URL = os.environ.get("RECOGNITION_SERVER_URL")
+remote = RecognitionClient(RECOGNITION_SERVER_URL, DEVICE_ID) if RECOGNITION_SERVER_URL else None
 
 # ✅ I2C LCD Setup
 I2C_ADDR = 0x27
@@ -47,46 +82,155 @@ def lcd_toggle_enable(bits):
     time.sleep(0.0005)
 
 def lcd_display(message, line):
-    message = message.ljust(LCD_WIDTH)
-    lcd_send_byte(line, 0)
-    for char in message:
-        lcd_send_byte(ord(char), 1)
-
-# ✅ Startup LCD
-lcd_init()
-lcd_display("Starting...", LCD_LINE_1)
-lcd_display("System Ready!", LCD_LINE_2)
-time.sleep(1)
-
-# ✅ Camera Setup
-video_capture = cv2.VideoCapture(0)
-if not video_capture.isOpened():
-    lcd_display("Cam Error!", LCD_LINE_1)
-    print("[ERROR] Webcam access failed.")
-    exit()
-
-# ✅ Load Encodings
-with open("/home/pi/attendance_system/encodings.pickle", "rb") as f:
-    data = pickle.load(f)
-    known_face_encodings = data["encodings"]
-    known_face_names = data["names"]
+    with STAGE_SECONDS.time(stage="lcd"):
+        message = message.ljust(LCD_WIDTH)
+        lcd_send_byte(line, 0)
+        for char in message:
+            lcd_send_byte(ord(char), 1)
+
+# ✅ Startup: models and gallery load in parallel with LCD and camera bring-up
+ENCODINGS_PATH = "/home/pi/attendance_system/encodings.pickle"
+readiness = Readiness(("models", "gallery", "lcd", "camera", "warmup")).start()
+face_recognition = None
+detector = None
+gallery = None
+video_capture = None
+
+def load_models():
+    global face_recognition, detector
+    try:
+        if not remote:
+            import face_recognition  # loads the dlib detector, landmark and encoder models
+        # FACE_DETECTOR=hog|haar|lbp|dnn; thin kiosks default to haar
+        detector = create_detector(None if os.environ.get("FACE_DETECTOR") or not remote else "haar")
+        print(f"[INFO] Face detector: {detector.name}")
+        readiness.mark("models")
+    except Exception as e:
+        readiness.fail("models", e)
+
+def load_known_faces():
+    global gallery
+    if remote:
+        print(f"[INFO] Recognition server: {RECOGNITION_SERVER_URL}")
+        readiness.mark("gallery")
+        return
+    try:
+        with open(ENCODINGS_PATH, "rb") as f:
+            data = pickle.load(f)
+        gallery = load_gallery(data)  # GALLERY_FORMAT=float16|int8 for compact matching
+        print(f"[INFO] Gallery: {len(gallery)} faces, {gallery.format}, {gallery.memory_bytes()} bytes")
+        readiness.mark("gallery")
+    except Exception as e:
+        readiness.fail("gallery", e)
+
+def warm_up(frame):
+    # The first dlib calls page in model weights; pay for that before anyone
+    # is standing in front of the kiosk
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    h, w = rgb.shape[:2]
+    detector.detect(rgb)
+    if not remote:
+        face_recognition.face_encodings(rgb, [(h // 4, w * 3 // 4, h * 3 // 4, w // 4)])
+    readiness.mark("warmup")
 
 # ✅ Constants
 TOLERANCE = 0.55
 attendance_queue = Queue()
-last_seen = {}
+presence = PresenceEngine()
 db_path = "/home/pi/attendance_system/attendance.db"
 gc.enable()
+REUSE_FRAME_BUFFERS = os.environ.get("FRAME_BUFFER_REUSE", "1") == "1"
 stop_event = threading.Event()
 
-def update_attendance(name):
-    attendance_queue.put(name)
+# ✅ Tracker: reuse identities across frames instead of re-encoding every face
+USE_OPTICAL_FLOW = os.environ.get("TRACKER_OPTICAL_FLOW", "0") == "1"
+tracker = FaceTracker(OpticalFlowTracker() if USE_OPTICAL_FLOW else None, TOLERANCE)
+
+# ✅ Frame rate follows activity, CPU budget, temperature and queue depth
+scheduler = FrameScheduler()
+
+def update_attendance(name, seen_at=None, kind="entered"):
+    attendance_queue.put((name, seen_at or time.time(), kind))
+    QUEUE_DEPTH.set(attendance_queue.qsize())
+
+# -> (name, distance) per track, name "Unknown" if no match, or None when no
+# encoding was produced
+def identify(frame, rgb, tracks):
+    if remote:
+        with STAGE_SECONDS.time(stage="remote"):
+            results = remote.identify(frame, [track.box for track in tracks])
+        if results is None:
+            return [None] * len(tracks)
+        ENCODES.inc(len(tracks))
+        # The server only reports the nearest face; accept it with the same
+        # TOLERANCE the tracker locks against
+        return [(match if match is not None and distance < TOLERANCE else "Unknown", distance)
+                for match, distance in results]
+
+    names = []
+    for track in tracks:
+        with STAGE_SECONDS.time(stage="encode"):
+            encoding = face_recognition.face_encodings(rgb, [track.box])
+        ENCODES.inc()
+        if not encoding:
+            names.append(None)
+            continue
+
+        with STAGE_SECONDS.time(stage="match"):
+            best_match, distance = gallery.best_match(encoding[0])
+        name = gallery.names[best_match] if best_match is not None and distance < TOLERANCE else "Unknown"
+        names.append((name, distance))
+    return names
+
+def handle_presence_events(events):
+    for kind, name, at, dwell in events:
+        if kind == "entered":
+            lcd_display(f"Name: {name}", LCD_LINE_1)
+            lcd_display("Marked ", LCD_LINE_2)
+            print(f" {name} marked attendance")
+        elif kind == "left":
+            print(f" {name} left after {int(dwell)}s")
+        update_attendance(name, at, kind)
 
 def handle_unknown():
     lcd_display("New User", LCD_LINE_1)
     lcd_display("Enter Details", LCD_LINE_2)
     time.sleep(2)
 
+def sync_payload(payload, label):
+    # -> False when the upload should be retried. device_id + seq let the
+    # server drop replays from this kiosk, so a retry keeps its seq
+    payload["device_id"] = DEVICE_ID
+    if "seq" not in payload:
+        payload["seq"] = sequence.next()
+    try:
+        response = requests.post(PUBLIC_SERVER_URL, json=payload, timeout=10)
+        if response.status_code == 409:
+            # The server already holds this seq for another event: our
+            # counter went backwards. Jump past the server cursor and retry once
+            print(f"[SYNC] Sequence conflict at {payload['seq']}: {response.text}")
+            sequence.resync()
+            payload["seq"] = sequence.next()
+            response = requests.post(PUBLIC_SERVER_URL, json=payload, timeout=10)
+        if response.status_code == 200:
+            SYNC_RESULTS.inc(result="success")
+            print(f"[{label}] {payload['name']}")
+            return True
+        SYNC_RESULTS.inc(result="failure")
+        print(f"[SYNC FAIL] {payload['name']}: {response.status_code} {response.text}")
+        # Other 4xx answers will not change on a retry
+        return response.status_code < 500
+    except Exception as e:
+        SYNC_RESULTS.inc(result="error")
+        print(f"[SYNC FAIL] {e}")
+        return False
+
+def sync_unsent(unsent):
+    # Oldest first, so the server sees this kiosk's events in order
+    while unsent and sync_payload(unsent[0], "SYNCED"):
+        unsent.popleft()
+    UNSENT.set(len(unsent))
+
 def db_writer():
     conn = sqlite3.connect(db_path, check_same_thread=False)
     cursor = conn.cursor()
@@ -102,86 +246,79 @@ def db_writer():
                 "login_logout": row[3],
                 "total_hours": row[4]
             }
-            try:
-                response = requests.post(PUBLIC_SERVER_URL, json=payload, timeout=10)
-                if response.status_code == 200:
-                    print(f"[BACKUP SYNCED] {row[1]} - {row[2]}")
-            except Exception as e:
-                print(f"[SYNC ERROR] {e}")
+            sync_payload(payload, "BACKUP SYNCED")
         cursor.execute("DELETE FROM attendance WHERE day = ?", (yesterday,))
         conn.commit()
     except Exception as e:
         print(f"[ERROR] During backup: {e}")
 
     # ✅ Real-time attendance processing
+    unsent = deque()
     while True:
-        name = attendance_queue.get()
-        if name is None:
+        try:
+            item = attendance_queue.get(timeout=SYNC_RETRY_SECONDS if unsent else None)
+        except Empty:
+            sync_unsent(unsent)
+            continue
+        QUEUE_DEPTH.set(attendance_queue.qsize())
+        if item is None:
             break
+        name, seen_at, kind = item
+        write_started = time.perf_counter()
 
         try:
-            today = datetime.date.today().strftime("%Y-%m-%d")
-            now = datetime.datetime.now().strftime("%H:%M:%S")
-
-            cursor.execute("SELECT login_logout FROM attendance WHERE name = ? AND day = ?", (name, today))
-            result = cursor.fetchone()
-
-            if result:
-                logs = result[0].split(", ")
-                login_time = None
-                logout_time = now
-                for entry in logs:
-                    if entry.startswith("Login:"):
-                        login_time = entry.split("Login: ")[-1]
-                        break
-
-                if not login_time:
-                    login_time = now
-
-                login_logout = f"Login: {login_time}, Logout: {logout_time}"
-                t1 = datetime.datetime.strptime(login_time, "%H:%M:%S")
-                t2 = datetime.datetime.strptime(logout_time, "%H:%M:%S")
-                total_seconds = (t2 - t1).seconds
-                total_hours = str(datetime.timedelta(seconds=total_seconds))
-
-                cursor.execute("""
-                    UPDATE attendance SET login_logout = ?, total_hours = ? WHERE name = ? AND day = ?
-                """, (login_logout, total_hours, name, today))
-            else:
-                login_logout = f"Login: {now}"
-                total_hours = "00:00:00"
-                cursor.execute("""
-                    INSERT INTO attendance (name, day, login_logout, total_hours)
-                    VALUES (?, ?, ?, ?)
-                """, (name, today, login_logout, total_hours))
+            seen = datetime.datetime.fromtimestamp(seen_at)
+            today = seen.strftime("%Y-%m-%d")
+            now = seen.strftime("%H:%M:%S")
+
+            login_logout, total_hours = record_attendance(cursor, name, today, now)
 
             conn.commit()
+            DB_COMMIT_SECONDS.observe(time.perf_counter() - write_started)
 
             payload = {
                 "name": name,
                 "day": today,
                 "login_logout": login_logout,
-                "total_hours": total_hours
+                "total_hours": total_hours,
+                "timestamp": seen.strftime("%Y-%m-%d %H:%M:%S"),
+                "event": kind
             }
-            try:
-                response = requests.post(PUBLIC_SERVER_URL, json=payload, timeout=10)
-                if response.status_code == 200:
-                    print(f"[SYNCED] {name}")
-            except Exception as e:
-                print(f"[SYNC FAIL] {e}")
+            if len(unsent) >= SYNC_MAX_UNSENT:
+                dropped = unsent.popleft()
+                print(f"[SYNC FAIL] Unsent backlog full, dropping {dropped['name']} at {dropped['timestamp']}")
+            unsent.append(payload)
+            sync_unsent(unsent)
         except Exception as e:
             print(f"[DB ERROR] {e}")
 
+    # One last attempt on shutdown; whatever is still unsent is lost
+    sync_unsent(unsent)
+    if unsent:
+        print(f"[WARN] {len(unsent)} attendance events were never uploaded.")
     conn.close()
 
 def detect_faces():
+    buffers = FrameBuffers() if REUSE_FRAME_BUFFERS else None
     while not stop_event.is_set():
-        ret, frame = video_capture.read()
+        scheduler.begin()
+        with STAGE_SECONDS.time(stage="read"):
+            if buffers:
+                ret, frame = buffers.read(video_capture)
+            else:
+                ret, frame = video_capture.read()
         if not ret:
+            print("[ERROR] Camera returned no frame, stopping detection.")
+            readiness.stop("camera returned no frame")
             break
+        FRAMES.inc()
+        readiness.heartbeat()
 
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        locations = face_recognition.face_locations(rgb)
+        with STAGE_SECONDS.time(stage="convert"):
+            rgb = buffers.to_rgb() if buffers else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with STAGE_SECONDS.time(stage="detect"):
+            locations = detector.detect(rgb)
+        FACES.inc(len(locations))
 
         if not locations:
             lcd_display("No Face Found", LCD_LINE_1)
@@ -190,40 +327,98 @@ def detect_faces():
             lcd_display(f"Faces: {len(locations)}", LCD_LINE_1)
             lcd_display("Scanning...", LCD_LINE_2)
 
-        for location in locations:
-            encoding = face_recognition.face_encodings(rgb, [location])
-            if not encoding:
+        gray = None
+        if USE_OPTICAL_FLOW:
+            gray = buffers.to_gray() if buffers else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        tracks = tracker.update(locations, gray)
+        # All faces that need (re)verification go out together, so thin kiosks
+        # make one request per frame
+        pending = [track for track in tracks if track.needs_verification()]
+        identified = dict(zip(map(id, pending), identify(frame, rgb, pending))) if pending else {}
+        for track in tracks:
+            if id(track) in identified:
+                result = identified[id(track)]
+                if result is None:
+                    continue
+                previous = track.name
+                tracker.verify(track, *result)
+                if track.name == "Unknown":
+                    # Unknown tracks are re-checked often; prompt only once per track
+                    if previous != "Unknown":
+                        handle_unknown()
+                    continue
+                readiness.recognised()
+            else:
+                tracker.reuse(track)
+
+            name = track.name
+            if name == "Unknown":
                 continue
 
-            face_encoding = encoding[0]
-            distances = face_recognition.face_distance(known_face_encodings, face_encoding)
-            best_match = distances.argmin()
-
-            if best_match is not None and distances[best_match] < TOLERANCE:
-                name = known_face_names[best_match]
-                now = time.time()
-                if name not in last_seen or now - last_seen[name] > 10:
-                    last_seen[name] = now
-                    lcd_display(f"Name: {name}", LCD_LINE_1)
-                    lcd_display("Marked ", LCD_LINE_2)
-                    print(f" {name} marked attendance")
-                    update_attendance(name)
-            else:
-                handle_unknown()
+            handle_presence_events(presence.observe(name, time.time()))
 
-        time.sleep(0.1)
-        gc.collect()
-        cv2.waitKey(1)
+        handle_presence_events(presence.sweep(time.time()))
+        stop_event.wait(scheduler.end(len(locations), attendance_queue.qsize()))
 
     # ✅ Show completion message once
     lcd_display("Detection", LCD_LINE_1)
     lcd_display("Completed", LCD_LINE_2)
 
+def run_detection():
+    # However the frame loop ends (camera gone, crash, shutdown), the health
+    # file and detector_ready must stop saying ready
+    try:
+        detect_faces()
+    finally:
+        if readiness.stopped is None:
+            readiness.stop("detection stopped")
+
 # ✅ Start Threads
+start_device_exporter()
+install_signal_trigger("detector")
 db_thread = threading.Thread(target=db_writer)
-face_thread = threading.Thread(target=detect_faces)
-
 db_thread.start()
+
+loaders = [threading.Thread(target=load_models, name="load-models"),
+           threading.Thread(target=load_known_faces, name="load-gallery")]
+for loader in loaders:
+    loader.start()
+
+lcd_init()
+lcd_display("Starting...", LCD_LINE_1)
+lcd_display("Please wait", LCD_LINE_2)
+readiness.mark("lcd")
+
+video_capture = cv2.VideoCapture(0)
+if not video_capture.isOpened():
+    lcd_display("Cam Error!", LCD_LINE_1)
+    print("[ERROR] Webcam access failed.")
+    readiness.fail("camera", "webcam access failed")
+    attendance_queue.put(None)
+    exit()
+# Keep only the newest frame, so a read after an idle-rate sleep is not stale
+video_capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+readiness.mark("camera")
+
+for loader in loaders:
+    loader.join()
+if readiness.errors:
+    lcd_display("Load Error!", LCD_LINE_1)
+    print(f"[ERROR] Startup failed: {readiness.errors}")
+    attendance_queue.put(None)
+    video_capture.release()
+    exit()
+
+ret, first_frame = video_capture.read()
+if ret:
+    warm_up(first_frame)
+else:
+    print("[WARN] No frame for warm-up, skipping.")
+    readiness.mark("warmup")
+
+tune_gc()
+lcd_display("System Ready!", LCD_LINE_2)
+face_thread = threading.Thread(target=run_detection)
 face_thread.start()
 
 try:
@@ -232,8 +427,9 @@ try:
 except KeyboardInterrupt:
     print("[INFO] Stopping system...")
     stop_event.set()
-    attendance_queue.put(None)
     face_thread.join()
+    handle_presence_events(presence.flush())
+    attendance_queue.put(None)
     db_thread.join()
     video_capture.release()
     print("[INFO] System exited.")
@@ -0,0 +1,104 @@
+import os
+import socket
+import threading
+import time
+
+# ✅ Kiosk identity for multi-device ingestion. Every event a kiosk uploads
+# carries (device_id, seq); seq is monotonic per device and survives restarts,
+# so the server can drop replayed POSTs.
+SEQ_PATH = os.environ.get("DEVICE_SEQ_PATH", "/home/pi/attendance_system/device_seq")
+SEQ_RESERVE = 100   # persist in blocks so each event is not an fsync
+MACHINE_ID_PATH = "/etc/machine-id"
+
+
+def hardware_id():
+    # The Pi CPU serial is unique per board; machine-id is the fallback (it is
+    # shared by SD cards cloned after first boot, so the serial comes first)
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("Serial"):
+                    serial = line.split(":", 1)[1].strip().lstrip("0")
+                    if serial:
+                        return serial
+    except OSError:
+        pass
+    try:
+        with open(MACHINE_ID_PATH) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def resolve_device_id():
+    # Every stock Pi image is called "raspberrypi", so the hostname alone
+    # would make kiosks share one id and collide on seq
+    device_id = os.environ.get("DEVICE_ID")
+    if device_id:
+        return device_id
+    hw = hardware_id()
+    if not hw:
+        raise SystemExit("[ERROR] No CPU serial or /etc/machine-id; set DEVICE_ID for this kiosk.")
+    return f"{socket.gethostname()}-{hw[-8:]}"
+
+
+DEVICE_ID = resolve_device_id()
+
+
+class SequenceCounter:
+    # Reserves numbers in blocks of SEQ_RESERVE. After a crash the device skips
+    # the rest of the block, which keeps numbers strictly increasing. When the
+    # file is lost, numbering continues above the server's cursor for this
+    # device (GET cursor_url); if the server is unreachable it continues from
+    # the clock in milliseconds, which is above any counter that started at 1.
+    def __init__(self, path=SEQ_PATH, reserve=SEQ_RESERVE, cursor_url=None):
+        self.path = path
+        self.reserve = reserve
+        self.cursor_url = cursor_url
+        self._lock = threading.Lock()
+        self._next = self._load()
+        self._limit = self._next
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            print(f"[WARN] Sequence file {self.path} missing or unreadable; recovering from server cursor.")
+            return self._recover()
+
+    def _recover(self):
+        if self.cursor_url:
+            try:
+                import requests
+                response = requests.get(self.cursor_url, timeout=10)
+                response.raise_for_status()
+                last_seq = int(response.json()["last_seq"])
+                print(f"[INFO] Server cursor for this device: {last_seq}")
+                return last_seq + 1
+            except Exception as e:
+                print(f"[WARN] Cannot read server cursor: {e}")
+        return int(time.time() * 1000)
+
+    def _persist(self, value):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(value))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def next(self):
+        with self._lock:
+            if self._next >= self._limit:
+                self._limit = self._next + self.reserve
+                self._persist(self._limit)
+            value = self._next
+            self._next += 1
+            return value
+
+    def resync(self):
+        # The server rejected a seq as reused: jump past its cursor
+        with self._lock:
+            self._next = max(self._next, self._recover())
+            self._limit = self._next
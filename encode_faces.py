@@ -3,8 +3,10 @@ import face_recognition
 import sqlite3
 import os
 import numpy as np
+import pickle
 import smbus
 import time
+from gallery import Gallery, GALLERY_FORMAT
 
 # ✅ LCD Setup
 I2C_ADDR = 0x27
@@ -48,6 +50,7 @@ def lcd_display(message, line):
 # ✅ Paths
 DB_PATH = "/home/pi/attendance_system/attendance.db"
 IMAGE_DIR = "/home/pi/attendance_system/student_images"
+ENCODINGS_PATH = "/home/pi/attendance_system/encodings.pickle"
 
 # ✅ Ensure database is set up
 conn = sqlite3.connect(DB_PATH)
@@ -60,6 +63,14 @@ cursor.execute("""
         encoding BLOB NOT NULL
     )
 """)
+# Storage format of the encoding blobs (float64/float32/float16/int8) and,
+# for int8, the per-dimension scales needed to decode them
+cursor.execute("""
+    CREATE TABLE IF NOT EXISTS gallery_meta (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL
+    )
+""")
 conn.commit()
 
 def encode_faces():
@@ -75,18 +86,34 @@ def encode_faces():
             encodings = face_recognition.face_encodings(image)
 
             if encodings:
-                encoding = encodings[0]
-                face_encodings.append(encoding)
+                face_encodings.append(encodings[0])
                 face_names.append(name)
-
-                cursor.execute("INSERT OR REPLACE INTO student_faces (name, encoding) VALUES (?, ?)", 
-                               (name, encoding.tobytes()))
-                conn.commit()
-                print(f"[INFO] Encoded & stored: {name}")
+                print(f"[INFO] Encoded: {name}")
             else:
                 print(f"[WARNING] No face detected in {file}. Skipping.")
 
+    # ✅ Store in the compact format (int8 scales depend on the whole gallery,
+    # so rows are written once every face is encoded)
+    gallery = Gallery.from_encodings(face_encodings, face_names, GALLERY_FORMAT)
+    # Rows from earlier runs were quantized with other scales; replace the whole
+    # table in the same transaction as the new rows and meta
+    cursor.execute("DELETE FROM student_faces")
+    for name, row in zip(gallery.names, gallery.data):
+        cursor.execute("INSERT OR REPLACE INTO student_faces (name, encoding) VALUES (?, ?)",
+                       (name, row.tobytes()))
+    cursor.execute("INSERT OR REPLACE INTO gallery_meta (key, value) VALUES ('format', ?)", (gallery.format,))
+    if gallery.scales is not None:
+        cursor.execute("INSERT OR REPLACE INTO gallery_meta (key, value) VALUES ('scales', ?)",
+                       (gallery.scales.tobytes(),))
+    else:
+        cursor.execute("DELETE FROM gallery_meta WHERE key = 'scales'")
+    conn.commit()
     conn.close()
+
+    with open(ENCODINGS_PATH, "wb") as f:
+        pickle.dump(gallery.to_dict(), f)
+    print(f"[INFO] Stored {len(gallery)} faces as {gallery.format} "
+          f"({gallery.data.itemsize * 128} bytes per student)")
     print("[INFO] Face encoding completed for all students.")
 
     # ✅ Show LCD message
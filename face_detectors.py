@@ -0,0 +1,124 @@
+import os
+
+import cv2
+
+# ✅ Face detector backends. Every backend takes an RGB frame and returns boxes
+# in face_recognition's (top, right, bottom, left) order, so the rest of the
+# pipeline (tracker, encoder) does not care which one is running.
+#
+# Select per deployment with FACE_DETECTOR:
+#   hog   dlib HOG via face_recognition (default, the original behaviour)
+#   haar  OpenCV Haar cascade shipped with opencv-python
+#   lbp   OpenCV LBP cascade; FACE_DETECTOR_CASCADE must point at the .xml
+#         (opencv-python only ships the Haar files)
+#   dnn   OpenCV DNN SSD face detector from a local model file
+#         (FACE_DETECTOR_MODEL, plus FACE_DETECTOR_CONFIG for Caffe/TF models)
+# DETECT_SCALE < 1 runs detection on a downscaled frame for any backend.
+DEFAULT_HAAR = "haarcascade_frontalface_default.xml"
+
+
+class FaceDetector:
+    name = "base"
+
+    def __init__(self, scale=1.0):
+        self.scale = scale
+
+    def detect(self, rgb):
+        if self.scale == 1.0:
+            return self._detect(rgb)
+        small = cv2.resize(rgb, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        inv = 1.0 / self.scale
+        h, w = rgb.shape[:2]
+        return [(int(top * inv), min(int(right * inv), w), min(int(bottom * inv), h), int(left * inv))
+                for top, right, bottom, left in self._detect(small)]
+
+    def _detect(self, rgb):
+        raise NotImplementedError
+
+
+class HogDetector(FaceDetector):
+    name = "hog"
+
+    def __init__(self, upsample=1, scale=1.0):
+        super().__init__(scale)
+        import face_recognition
+        self.face_recognition = face_recognition
+        self.upsample = upsample
+
+    def _detect(self, rgb):
+        return self.face_recognition.face_locations(rgb, number_of_times_to_upsample=self.upsample, model="hog")
+
+
+class CascadeDetector(FaceDetector):
+    name = "haar"
+
+    def __init__(self, cascade_path=None, scale_factor=1.1, min_neighbors=5, min_size=40, scale=1.0):
+        super().__init__(scale)
+        cascade_path = cascade_path or os.path.join(cv2.data.haarcascades, DEFAULT_HAAR)
+        self.classifier = cv2.CascadeClassifier(cascade_path)
+        if self.classifier.empty():
+            raise ValueError(f"Could not load cascade: {cascade_path}")
+        if "lbp" in os.path.basename(cascade_path).lower():
+            self.name = "lbp"
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = (min_size, min_size)
+        self.gray = None
+
+    def _detect(self, rgb):
+        if self.gray is None or self.gray.shape != rgb.shape[:2]:
+            self.gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        else:
+            cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY, dst=self.gray)
+        rects = self.classifier.detectMultiScale(self.gray, scaleFactor=self.scale_factor,
+                                                 minNeighbors=self.min_neighbors, minSize=self.min_size)
+        return [(int(y), int(x + w), int(y + h), int(x)) for (x, y, w, h) in rects]
+
+
+class DnnDetector(FaceDetector):
+    # Expects the common SSD output layout [1, 1, N, 7] (e.g. the res10 300x300
+    # Caffe face model); mean values are for BGR input, hence swapRB
+    name = "dnn"
+
+    def __init__(self, model_path, config_path=None, confidence=0.6, input_size=300,
+                 mean=(104.0, 177.0, 123.0), scale=1.0):
+        super().__init__(scale)
+        if not model_path or not os.path.exists(model_path):
+            raise ValueError(f"DNN model not found: {model_path}")
+        self.net = cv2.dnn.readNet(model_path, config_path or "")
+        self.confidence = confidence
+        self.input_size = (input_size, input_size)
+        self.mean = mean
+
+    def _detect(self, rgb):
+        h, w = rgb.shape[:2]
+        blob = cv2.dnn.blobFromImage(rgb, 1.0, self.input_size, self.mean, swapRB=True, crop=False)
+        self.net.setInput(blob)
+        detections = self.net.forward().reshape(-1, 7)
+        boxes = []
+        for _, _, score, x1, y1, x2, y2 in detections:
+            if score < self.confidence:
+                continue
+            left, top = max(int(x1 * w), 0), max(int(y1 * h), 0)
+            right, bottom = min(int(x2 * w), w), min(int(y2 * h), h)
+            if right > left and bottom > top:
+                boxes.append((top, right, bottom, left))
+        return boxes
+
+
+def create_detector(name=None, **options):
+    name = (name or os.environ.get("FACE_DETECTOR", "hog")).lower()
+    scale = float(options.pop("scale", os.environ.get("DETECT_SCALE", 1.0)))
+    if name == "hog":
+        return HogDetector(upsample=int(options.get("upsample", os.environ.get("HOG_UPSAMPLE", 1))), scale=scale)
+    if name in ("haar", "lbp"):
+        cascade_path = options.get("cascade_path", os.environ.get("FACE_DETECTOR_CASCADE"))
+        if name == "lbp" and not cascade_path:
+            raise ValueError("LBP detector needs FACE_DETECTOR_CASCADE (e.g. lbpcascade_frontalface_improved.xml)")
+        return CascadeDetector(cascade_path, scale=scale)
+    if name == "dnn":
+        return DnnDetector(options.get("model_path", os.environ.get("FACE_DETECTOR_MODEL")),
+                           options.get("config_path", os.environ.get("FACE_DETECTOR_CONFIG")),
+                           confidence=float(options.get("confidence", os.environ.get("DNN_CONFIDENCE", 0.6))),
+                           scale=scale)
+    raise ValueError(f"Unknown face detector: {name}")
@@ -0,0 +1,175 @@
+import itertools
+import time
+
+# ✅ Tracker Settings
+IOU_MATCH_THRESHOLD = 0.3      # min overlap to continue a track
+CENTROID_MATCH_RATIO = 0.5     # fallback: centroid shift as a fraction of box size
+MAX_MISSED_FRAMES = 5          # drop a track after this many frames without a detection
+# Re-checks are time-based because the detection rate varies (scheduler.py)
+REVERIFY_SECONDS = 3.0         # between identity re-checks of a confident track
+UNSURE_REVERIFY_SECONDS = 0.5  # Unknown or borderline tracks: about every frame on a Pi
+CONFIDENT_MARGIN = 0.05        # an identity is locked only below TOLERANCE - margin
+REVERIFY_IOU = 0.5             # re-check early when the box drifts below this overlap
+
+
+# Boxes use face_recognition's (top, right, bottom, left) order
+def box_iou(a, b):
+    top = max(a[0], b[0])
+    right = min(a[1], b[1])
+    bottom = min(a[2], b[2])
+    left = max(a[3], b[3])
+    if right <= left or bottom <= top:
+        return 0.0
+    inter = (right - left) * (bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return inter / float(area_a + area_b - inter)
+
+
+def box_centroid(box):
+    return ((box[1] + box[3]) / 2.0, (box[0] + box[2]) / 2.0)
+
+
+def centroid_close(a, b, ratio=CENTROID_MATCH_RATIO):
+    ax, ay = box_centroid(a)
+    bx, by = box_centroid(b)
+    size = max(a[1] - a[3], a[2] - a[0], 1)
+    return abs(ax - bx) <= size * ratio and abs(ay - by) <= size * ratio
+
+
+class Track:
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = box
+        self.name = None          # None until verified; "Unknown" for strangers
+        self.verified_box = None  # box at the last encode + match
+        self.distance = None      # match distance at the last verification
+        self.confident = False    # known identity well inside the tolerance
+        self.verified_at = None
+        self.seen_at = None       # time of the frame the track was last seen in
+        self.missed = 0
+        self.age = 0
+
+    def needs_verification(self):
+        if self.verified_box is None:
+            return True
+        interval = REVERIFY_SECONDS if self.confident else UNSURE_REVERIFY_SECONDS
+        if self.seen_at - self.verified_at >= interval:
+            return True
+        return box_iou(self.box, self.verified_box) < REVERIFY_IOU
+
+
+class FaceTracker:
+    def __init__(self, flow_tracker=None, tolerance=0.55):
+        self.tracks = []
+        self._ids = itertools.count(1)
+        self.flow_tracker = flow_tracker
+        self.lock_distance = tolerance - CONFIDENT_MARGIN
+        self.encodes = 0
+        self.reuses = 0
+
+    def update(self, locations, gray=None, now=None):
+        # `now` defaults to the wall clock; replays pass the video time
+        now = time.monotonic() if now is None else now
+        # Optionally shift tracks along optical flow before matching
+        if self.flow_tracker is not None and gray is not None:
+            self.flow_tracker.advance(self.tracks, gray)
+
+        # Greedy IoU assignment, best overlaps first
+        pairs = []
+        for ti, track in enumerate(self.tracks):
+            for di, box in enumerate(locations):
+                iou = box_iou(track.box, box)
+                if iou >= IOU_MATCH_THRESHOLD:
+                    pairs.append((iou, ti, di))
+        pairs.sort(reverse=True)
+
+        used_tracks = set()
+        used_dets = set()
+        for _, ti, di in pairs:
+            if ti in used_tracks or di in used_dets:
+                continue
+            used_tracks.add(ti)
+            used_dets.add(di)
+            self._hit(self.tracks[ti], locations[di], now)
+
+        # Centroid fallback for fast movers that lost all overlap
+        for ti, track in enumerate(self.tracks):
+            if ti in used_tracks:
+                continue
+            for di, box in enumerate(locations):
+                if di not in used_dets and centroid_close(track.box, box):
+                    used_tracks.add(ti)
+                    used_dets.add(di)
+                    self._hit(track, box, now)
+                    break
+
+        for ti, track in enumerate(self.tracks):
+            if ti not in used_tracks:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= MAX_MISSED_FRAMES]
+
+        for di, box in enumerate(locations):
+            if di not in used_dets:
+                track = Track(next(self._ids), box)
+                track.seen_at = now
+                self.tracks.append(track)
+
+        # Only tracks seen this frame are reported back
+        return [t for t in self.tracks if t.missed == 0]
+
+    def _hit(self, track, box, now):
+        track.box = box
+        track.missed = 0
+        track.age += 1
+        track.seen_at = now
+
+    def verify(self, track, name, distance):
+        track.name = name
+        track.distance = distance
+        track.confident = name != "Unknown" and distance < self.lock_distance
+        track.verified_box = track.box
+        track.verified_at = track.seen_at
+        self.encodes += 1
+
+    def reuse(self, track):
+        self.reuses += 1
+        return track.name
+
+
+class OpticalFlowTracker:
+    # Lucas-Kanade flow on the previous grey frame; shifts each track box by
+    # the median motion of corner features inside it
+    def __init__(self, max_corners=20):
+        self.max_corners = max_corners
+        self.prev_gray = None
+
+    def advance(self, tracks, gray):
+        import cv2
+        import numpy as np
+
+        prev = self.prev_gray
+        if prev is not None and prev.shape == gray.shape:
+            self._shift_tracks(tracks, prev, gray, cv2, np)
+            # Copy rather than keep a reference: the caller may reuse `gray`
+            np.copyto(prev, gray)
+        else:
+            self.prev_gray = gray.copy()
+
+    def _shift_tracks(self, tracks, prev, gray, cv2, np):
+        for track in tracks:
+            top, right, bottom, left = track.box
+            roi = prev[max(top, 0):bottom, max(left, 0):right]
+            if roi.size == 0:
+                continue
+            corners = cv2.goodFeaturesToTrack(roi, self.max_corners, 0.01, 3)
+            if corners is None:
+                continue
+            corners = corners + np.array([[max(left, 0), max(top, 0)]], dtype=np.float32)
+            moved, status, _ = cv2.calcOpticalFlowPyrLK(prev, gray, corners, None)
+            good = status.reshape(-1) == 1
+            if not good.any():
+                continue
+            dx, dy = np.median((moved - corners).reshape(-1, 2)[good], axis=0)
+            dx, dy = int(round(dx)), int(round(dy))
+            track.box = (top + dy, right + dx, bottom + dy, left + dx)
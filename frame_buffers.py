@@ -0,0 +1,52 @@
+import gc
+
+import cv2
+
+# ✅ GC tuning: the frame loop's garbage is almost all numpy buffers freed by
+# refcounting, so the cyclic collector only needs to run rarely. Raising the
+# gen-0 threshold and freezing startup objects (models, gallery) keeps each
+# collection short instead of forcing a full gc.collect() every frame.
+GC_THRESHOLDS = (50000, 50, 100)
+
+
+def tune_gc(thresholds=GC_THRESHOLDS):
+    gc.collect()
+    gc.freeze()
+    gc.set_threshold(*thresholds)
+
+
+class FrameBuffers:
+    # Reuses the same BGR / RGB / grey arrays for every frame. Buffers are
+    # (re)allocated only when the camera's frame size changes.
+    def __init__(self):
+        self.bgr = None
+        self.rgb = None
+        self.gray = None
+        self.reallocations = 0
+
+    def read(self, capture):
+        if self.bgr is None:
+            ret, frame = capture.read()
+        else:
+            ret, frame = capture.read(self.bgr)
+        if ret and frame is not self.bgr:
+            # First frame, or OpenCV had to allocate because the size changed
+            self.bgr = frame
+            self.rgb = None
+            self.gray = None
+            self.reallocations += 1
+        return ret, frame
+
+    def to_rgb(self):
+        if self.rgb is None:
+            self.rgb = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB)
+        else:
+            cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        return self.rgb
+
+    def to_gray(self):
+        if self.gray is None:
+            self.gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        else:
+            cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        return self.gray
@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+
+# ✅ Compact face gallery. Encodings can be kept as float64 (original),
+# float32, float16, or int8 with one scale per dimension. Distances run on the
+# stored format directly: ||g - q||^2 = ||g||^2 - 2 g.q + ||q||^2, with ||g||^2
+# precomputed and g.q done block by block so only a small float32 temporary
+# is ever materialised (float64 galleries compute in float64).
+#
+# Error bound (see error_bound()): storage rounding (int8: each component is off
+# by at most scale_j / 2, so any distance by at most 0.5 * ||scales||) plus the
+# float32 rounding of the ||g||^2 - 2 g.q + ||q||^2 evaluation.
+GALLERY_FORMATS = ("float64", "float32", "float16", "int8")
+GALLERY_FORMAT = os.environ.get("GALLERY_FORMAT", "float64")
+BLOCK_ROWS = 4096
+
+
+def quantize(encodings, fmt):
+    encodings = np.asarray(encodings, dtype=np.float64).reshape(-1, 128)
+    if fmt == "int8":
+        scales = np.abs(encodings).max(axis=0) / 127.0 if len(encodings) else np.ones(128)
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        data = np.clip(np.rint(encodings / scales), -127, 127).astype(np.int8)
+        return data, scales
+    if fmt not in GALLERY_FORMATS:
+        raise ValueError(f"Unknown gallery format: {fmt}")
+    return encodings.astype(fmt), None
+
+
+class Gallery:
+    def __init__(self, data, names, fmt, scales=None):
+        self.data = np.ascontiguousarray(data)
+        self.names = list(names)
+        self.format = fmt
+        self.scales = scales
+        # float64 galleries keep float64 maths so results match face_distance()
+        self.dtype = np.float64 if fmt == "float64" else np.float32
+        self.norms_sq = np.empty(len(self.data), dtype=self.dtype)
+        for start in range(0, len(self.data), BLOCK_ROWS):
+            block = self._dequantize(self.data[start:start + BLOCK_ROWS])
+            self.norms_sq[start:start + len(block)] = np.einsum("ij,ij->i", block, block)
+
+    @classmethod
+    def from_encodings(cls, encodings, names, fmt=GALLERY_FORMAT):
+        data, scales = quantize(encodings, fmt)
+        return cls(data, names, fmt, scales)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _dequantize(self, block):
+        block = block.astype(self.dtype)
+        if self.scales is not None:
+            block *= self.scales
+        return block
+
+    def distances(self, query):
+        q = np.asarray(query, dtype=self.dtype)
+        # Fold the int8 scales into the query instead of rescaling the gallery
+        qs = q * self.scales if self.scales is not None else q
+        dots = np.empty(len(self.data), dtype=self.dtype)
+        for start in range(0, len(self.data), BLOCK_ROWS):
+            block = self.data[start:start + BLOCK_ROWS]
+            dots[start:start + len(block)] = block.astype(self.dtype, copy=False) @ qs
+        sq = self.norms_sq - 2.0 * dots + float(q @ q)
+        return np.sqrt(np.maximum(sq, 0.0))
+
+    def distances_batch(self, queries):
+        # (B, 128) queries -> (B, N) distances in one pass over the gallery
+        q = np.asarray(queries, dtype=self.dtype).reshape(-1, self.data.shape[1])
+        qs = q * self.scales if self.scales is not None else q
+        dots = np.empty((len(q), len(self.data)), dtype=self.dtype)
+        for start in range(0, len(self.data), BLOCK_ROWS):
+            block = self.data[start:start + BLOCK_ROWS]
+            dots[:, start:start + len(block)] = qs @ block.astype(self.dtype, copy=False).T
+        sq = self.norms_sq[None, :] - 2.0 * dots + np.einsum("ij,ij->i", q, q)[:, None]
+        return np.sqrt(np.maximum(sq, 0.0))
+
+    def decode(self):
+        # -> (N, 128) float64 encodings as stored (after quantisation)
+        out = np.empty(self.data.shape, dtype=np.float64)
+        for start in range(0, len(self.data), BLOCK_ROWS):
+            block = self._dequantize(self.data[start:start + BLOCK_ROWS])
+            out[start:start + len(block)] = block
+        return out
+
+    def best_match(self, query):
+        if not len(self.data):
+            return None, float("inf")
+        distances = self.distances(query)
+        index = int(distances.argmin())
+        return index, float(distances[index])
+
+    def error_bound(self, at=None, query_norm=None):
+        # Worst-case absolute distance error against float64 maths on the
+        # original encodings, for distances near `at` (e.g. TOLERANCE); without
+        # `at` it holds for any distance but is much looser. query_norm
+        # defaults to the longest gallery encoding (dlib queries are alike).
+        if self.format == "float64" or not len(self.data):
+            return 0.0  # the reference
+        radius = float(np.sqrt(self.norms_sq.max()))
+        if self.format == "int8":
+            storage = float(0.5 * np.linalg.norm(self.scales))
+        elif self.format == "float16":
+            # half precision keeps ~11 bits of mantissa: |err| <= 2^-11 * |x| per component
+            storage = radius * 2.0 ** -11
+        else:
+            storage = radius * 2.0 ** -24
+        # float32 evaluation of the squared distance (128 products, 2 sums):
+        # |err| <= gamma_n * (||g|| + ||q||)^2, and |sqrt(a) - sqrt(b)| <= |a - b| / sqrt(b)
+        n = self.data.shape[1] + 2
+        gamma = n * 2.0 ** -24 / (1.0 - n * 2.0 ** -24)
+        sq_err = gamma * (radius + (radius if query_norm is None else query_norm)) ** 2
+        compute = sq_err / at if at else float(np.sqrt(sq_err))
+        return storage + compute
+
+    def memory_bytes(self):
+        total = self.data.nbytes + self.norms_sq.nbytes
+        return total + (self.scales.nbytes if self.scales is not None else 0)
+
+    def to_dict(self):
+        return {"format": self.format, "encodings": self.data, "scales": self.scales, "names": self.names}
+
+
+def load_gallery(data, fmt=None):
+    # Accepts both the legacy pickle ({"encodings": [float64 arrays], "names"})
+    # and Gallery.to_dict(); legacy galleries are converted to GALLERY_FORMAT
+    fmt = fmt or GALLERY_FORMAT
+    stored = data.get("format")
+    if stored is None or stored == "float64":
+        return Gallery.from_encodings(data["encodings"], data["names"], fmt)
+    if stored != fmt:
+        print(f"[INFO] Gallery stored as {stored}; using it as-is (GALLERY_FORMAT={fmt})")
+    return Gallery(np.asarray(data["encodings"]), data["names"], stored, data.get("scales"))
@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+# Load generator for the Flask server. Simulated kiosks POST /upload and
+# simulated users load /, each as an open-loop Poisson stream. Reports
+# throughput and latency percentiles per route, plus SQLite write-lock waits
+# scraped from /metrics, so server changes can be compared run-to-run:
+#   python load_test.py --spawn --workers 2 --devices 40 --users 20 --duration 60 --json run.json
+# --spawn starts gunicorn and upstream_stub.py locally; without it, point
+# --base-url at a server that already pushes to a stand-in upstream.
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def add(self, route, latency, ok):
+        with self.lock:
+            self.samples.setdefault(route, []).append(latency)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+
+def device_actor(base_url, device_id, rate, students, retry_rate, deadline, recorder, seed):
+    rng = random.Random(seed)
+    session = requests.Session()
+    seq = 0
+    while True:
+        wake = time.monotonic() + rng.expovariate(rate)
+        if wake >= deadline:
+            break
+        time.sleep(wake - time.monotonic())
+        seq += 1
+        payload = {
+            "name": f"Student{rng.randrange(students):03d}",
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "device_id": device_id,
+            "seq": seq,
+        }
+        for _ in range(2 if rng.random() < retry_rate else 1):
+            started = time.perf_counter()
+            try:
+                ok = session.post(base_url + "/upload", json=payload, timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            recorder.add("POST /upload", time.perf_counter() - started, ok)
+
+
+def user_actor(base_url, rate, deadline, recorder, seed):
+    rng = random.Random(seed)
+    session = requests.Session()
+    while True:
+        wake = time.monotonic() + rng.expovariate(rate)
+        if wake >= deadline:
+            break
+        time.sleep(wake - time.monotonic())
+        started = time.perf_counter()
+        try:
+            ok = session.get(base_url + "/", timeout=30).status_code == 200
+        except requests.RequestException:
+            ok = False
+        recorder.add("GET /", time.perf_counter() - started, ok)
+
+
+# ✅ /metrics scraping: each gunicorn worker has its own registry, so scrape
+# repeatedly and keep the latest snapshot per worker pid
+def parse_metrics(text):
+    pid = None
+    values = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        series, _, value = line.rpartition(" ")
+        if series.startswith("app_worker_info"):
+            pid = series.split('pid="')[1].split('"')[0]
+        values[series] = float(value.replace("+Inf", "inf"))
+    return pid, values
+
+
+def scrape_workers(base_url, workers, attempts=None):
+    snapshots = {}
+    for _ in range(attempts or max(10, workers * 8)):
+        try:
+            pid, values = parse_metrics(requests.get(base_url + "/metrics", timeout=5).text)
+        except requests.RequestException:
+            continue
+        if pid is not None:
+            snapshots[pid] = values
+        if len(snapshots) >= workers:
+            break
+    return snapshots
+
+
+def lock_wait_summary(before, after):
+    total = count = timeouts = 0.0
+    buckets = {}
+    for pid, values in after.items():
+        old = before.get(pid, {})
+        for series, value in values.items():
+            delta = value - old.get(series, 0.0)
+            if series.startswith("db_lock_wait_seconds_sum"):
+                total += delta
+            elif series.startswith("db_lock_wait_seconds_count"):
+                count += delta
+            elif series.startswith("db_lock_timeouts_total"):
+                timeouts += delta
+            elif series.startswith("db_lock_wait_seconds_bucket"):
+                le = float(series.split('le="')[1].split('"')[0].replace("+Inf", "inf"))
+                buckets[le] = buckets.get(le, 0.0) + delta
+    p95 = None
+    if count:
+        for le in sorted(buckets):
+            if buckets[le] >= 0.95 * count:
+                p95 = le
+                break
+    return {"workers_scraped": len(after), "waits": int(count), "total_wait_s": round(total, 4),
+            "mean_wait_ms": round(1000 * total / count, 3) if count else 0.0,
+            "p95_bucket_s": p95, "lock_timeouts": int(timeouts)}
+
+
+def wait_for(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"[ERROR] {url} did not come up")
+
+
+def spawn(args):
+    workdir = tempfile.mkdtemp(prefix="loadtest_")
+    stub = subprocess.Popen([sys.executable, os.path.join(HERE, "upstream_stub.py"),
+                             "--port", str(args.stub_port),
+                             "--latency-ms", str(args.upstream_latency_ms),
+                             "--failure-rate", str(args.upstream_failure_rate)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    env = dict(os.environ, DB_PATH=os.path.join(workdir, "attendance.db"),
+               RENDER_UPLOAD_URL=f"http://127.0.0.1:{args.stub_port}/upload")
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "app:app",
+                               "-w", str(args.workers), "--threads", str(args.threads),
+                               "-b", f"127.0.0.1:{args.port}"],
+                              cwd=workdir, env=dict(env, PYTHONPATH=HERE),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for(f"http://127.0.0.1:{args.stub_port}/stats")
+    wait_for(f"http://127.0.0.1:{args.port}/healthz")
+    return [server, stub]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the attendance server")
+    parser.add_argument("--base-url", default=None, help="default: the spawned server")
+    parser.add_argument("--spawn", action="store_true", help="start gunicorn + upstream stub locally")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--stub-port", type=int, default=5100)
+    parser.add_argument("--upstream-latency-ms", type=float, default=100.0)
+    parser.add_argument("--upstream-failure-rate", type=float, default=0.02)
+    parser.add_argument("--devices", type=int, default=20)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--device-rate", type=float, default=0.5, help="uploads/s per device")
+    parser.add_argument("--user-rate", type=float, default=0.2, help="page loads/s per user")
+    parser.add_argument("--retry-rate", type=float, default=0.05)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    processes = spawn(args) if args.spawn else []
+    base_url = args.base_url or f"http://127.0.0.1:{args.port}"
+    try:
+        before = scrape_workers(base_url, args.workers)
+        recorder = Recorder()
+        deadline = time.monotonic() + args.duration
+        actors = [threading.Thread(target=device_actor,
+                                   args=(base_url, f"load-{i:03d}", args.device_rate, args.students,
+                                         args.retry_rate, deadline, recorder, i))
+                  for i in range(args.devices)]
+        actors += [threading.Thread(target=user_actor,
+                                    args=(base_url, args.user_rate, deadline, recorder, 10000 + i))
+                   for i in range(args.users)]
+        started = time.monotonic()
+        for actor in actors:
+            actor.start()
+        for actor in actors:
+            actor.join()
+        elapsed = time.monotonic() - started
+        after = scrape_workers(base_url, args.workers)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    report = {"config": vars(args), "elapsed_s": round(elapsed, 2), "routes": {},
+              "sqlite_lock": lock_wait_summary(before, after)}
+    print(f"[INFO] {args.devices} devices, {args.users} users, {elapsed:.1f}s")
+    print(f"{'route':<14}{'reqs':>7}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, latencies in sorted(recorder.samples.items()):
+        stats = {"requests": len(latencies), "errors": recorder.errors.get(route, 0),
+                 "throughput": round(len(latencies) / elapsed, 2),
+                 "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                 "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                 "p99_ms": round(percentile(latencies, 99) * 1000, 2)}
+        report["routes"][route] = stats
+        print(f"{route:<14}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput']:>9}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}")
+    lock = report["sqlite_lock"]
+    print(f"[INFO] SQLite write lock: {lock['waits']} waits, {lock['total_wait_s']}s total,"
+          f" mean {lock['mean_wait_ms']} ms, p95 <= {lock['p95_bucket_s']}s,"
+          f" {lock['lock_timeouts']} timeouts ({lock['workers_scraped']} workers scraped)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
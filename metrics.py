@@ -0,0 +1,215 @@
+import bisect
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+# ✅ Lightweight metrics: counters, gauges and histograms rendered in the
+# Prometheus text format. Each update is a lock + an add, cheap enough to
+# leave on in the detector's hot path.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + (list(extra) if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+                    for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, key, value) for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        series = self._series.get(_label_key(labels))
+        return series[2] if series else 0
+
+    def samples(self):
+        out = []
+        with self._lock:
+            items = [(key, (list(s[0]), s[1], s[2])) for key, s in self._series.items()]
+        for key, (counts, total, count) in items:
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                out.append((self.name + "_bucket", key, running, (("le", _format_value(bound)),)))
+            out.append((self.name + "_sum", key, total))
+            out.append((self.name + "_count", key, count))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name, help_text=""):
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name, help_text=""):
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample in metric.samples():
+                name, key, value = sample[:3]
+                extra = sample[3] if len(sample) > 3 else None
+                lines.append(f"{name}{_format_labels(key, extra)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ✅ Exporters for the device process (no HTTP server on the Pi)
+class FileExporter(threading.Thread):
+    # Rewrites a .prom file atomically, e.g. for node_exporter's textfile collector
+    def __init__(self, path, interval=10.0, registry=REGISTRY):
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.stop_event = threading.Event()
+
+    def write_once(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.registry.render())
+        os.replace(tmp_path, self.path)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.write_once()
+            except OSError as e:
+                print(f"[METRICS] File export failed: {e}")
+
+
+class SocketExporter(threading.Thread):
+    # Serves the current snapshot to anyone who connects to a Unix socket:
+    #   socat - UNIX-CONNECT:/tmp/attendance_metrics.sock
+    def __init__(self, path, registry=REGISTRY):
+        super().__init__(daemon=True)
+        self.path = path
+        self.registry = registry
+
+    def run(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        server.listen(4)
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                try:
+                    conn.sendall(self.registry.render().encode("utf-8"))
+                except OSError:
+                    pass
+
+
+def start_device_exporter(registry=REGISTRY):
+    # METRICS_FILE and/or METRICS_SOCKET select the exporters; both optional
+    exporters = []
+    file_path = os.environ.get("METRICS_FILE")
+    if file_path:
+        exporters.append(FileExporter(file_path, float(os.environ.get("METRICS_INTERVAL", 10)), registry))
+    socket_path = os.environ.get("METRICS_SOCKET")
+    if socket_path:
+        exporters.append(SocketExporter(socket_path, registry))
+    for exporter in exporters:
+        exporter.start()
+        print(f"[INFO] Metrics exporter started: {exporter.__class__.__name__}")
+    return exporters
@@ -0,0 +1,254 @@
+import argparse
+import datetime
+import os
+import pickle
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from attendance_store import record_attendance
+from face_detectors import create_detector
+from gallery import load_gallery
+
+# ✅ Offline attendance from a lecture recording or a folder of classroom
+# photos. Video is split into chunks decoded and recognised in parallel (one
+# process per core); per-student sightings are aggregated with a confidence
+# score and written in a single transaction through attendance_store.
+#   python offline_attendance.py --video lecture.mp4 --start "2025-01-15 09:00:00"
+#   python offline_attendance.py --photos class_photos/ --date 2025-01-15
+DB_PATH = "/home/pi/attendance_system/attendance.db"
+ENCODINGS_PATH = "/home/pi/attendance_system/encodings.pickle"
+TOLERANCE = 0.55
+MIN_HITS = 2            # sightings needed before a student is marked from video
+SEEK_MARGIN = 5.0       # seconds; seeks may land on a later keyframe, so start early
+PHOTO_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# Per-process state, loaded once by the pool initializer
+_worker = {}
+
+
+def init_worker(encodings_path, detector_name):
+    import face_recognition
+    cv2.setNumThreads(1)  # parallelism comes from the process pool
+    with open(encodings_path, "rb") as f:
+        _worker["gallery"] = load_gallery(pickle.load(f))
+    _worker["detector"] = create_detector(detector_name)
+    _worker["face_recognition"] = face_recognition
+
+
+def recognise(rgb, at, sightings):
+    gallery = _worker["gallery"]
+    locations = _worker["detector"].detect(rgb)
+    if not locations:
+        return
+    encodings = _worker["face_recognition"].face_encodings(rgb, locations)
+    if not encodings:
+        return
+    distances = gallery.distances_batch(encodings)
+    for row in distances:
+        index = int(row.argmin())
+        distance = float(row[index])
+        if distance >= TOLERANCE:
+            continue
+        name = gallery.names[index]
+        s = sightings.get(name)
+        if s is None:
+            sightings[name] = [1, distance, distance, at, at]
+        else:
+            s[0] += 1
+            s[1] += distance
+            s[2] = min(s[2], distance)
+            s[3] = min(s[3], at)
+            s[4] = max(s[4], at)
+
+
+def process_chunk(video_path, start_s, end_s, interval):
+    # Returns ({name: [hits, distance_sum, best, first_s, last_s]}, frames_sampled).
+    # Frame times come from the decoder (CAP_PROP_POS_MSEC of the grabbed frame,
+    # the one retrieve() returns), not from counting frames after the seek:
+    # a seek can land on a keyframe before or after the requested position
+    capture = cv2.VideoCapture(video_path)
+    if start_s > 0:
+        capture.set(cv2.CAP_PROP_POS_MSEC, max(0.0, start_s - SEEK_MARGIN) * 1000.0)
+    sightings = {}
+    sampled = 0
+    rgb = None
+    next_at = start_s
+    # grab() skips frames without the colour conversion of read()
+    while capture.grab():
+        at = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if at >= end_s:
+            break
+        if at < next_at:
+            continue
+        ret, frame = capture.retrieve()
+        if not ret:
+            continue
+        if rgb is None or rgb.shape != frame.shape:
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        recognise(rgb, at, sightings)
+        sampled += 1
+        while next_at <= at:
+            next_at += interval
+    capture.release()
+    return sightings, sampled
+
+
+def process_photo(path):
+    image = cv2.imread(path)
+    sightings = {}
+    if image is not None:
+        recognise(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), os.path.getmtime(path), sightings)
+    return sightings, 1
+
+
+def merge(total, part):
+    for name, (hits, dist_sum, best, first, last) in part.items():
+        s = total.get(name)
+        if s is None:
+            total[name] = [hits, dist_sum, best, first, last]
+        else:
+            s[0] += hits
+            s[1] += dist_sum
+            s[2] = min(s[2], best)
+            s[3] = min(s[3], first)
+            s[4] = max(s[4], last)
+
+
+def summarise(sightings, samples, min_hits):
+    # confidence: closeness of the mean match to the threshold, damped for
+    # students seen only a handful of times
+    results = []
+    for name, (hits, dist_sum, best, first, last) in sightings.items():
+        mean = dist_sum / hits
+        confidence = (1.0 - mean / TOLERANCE) * min(1.0, hits / float(max(min_hits, 1)))
+        results.append({"name": name, "hits": hits, "presence": hits / float(max(samples, 1)),
+                        "mean_distance": mean, "best_distance": best, "confidence": confidence,
+                        "first": first, "last": last, "marked": hits >= min_hits})
+    results.sort(key=lambda r: (-r["confidence"], r["name"]))
+    return results
+
+
+def write_attendance(db_path, results, to_clock):
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        for r in results:
+            if not r["marked"]:
+                continue
+            first_day, first_time = to_clock(r["first"])
+            last_day, last_time = to_clock(r["last"])
+            record_attendance(cursor, r["name"], first_day, first_time)
+            if r["last"] > r["first"]:
+                record_attendance(cursor, r["name"], last_day, last_time)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def run_video(args):
+    capture = cv2.VideoCapture(args.video)
+    if not capture.isOpened():
+        raise SystemExit(f"[ERROR] Cannot open video: {args.video}")
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    total_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    if total_frames <= 0 or not fps or fps <= 0:
+        # Chunking needs the length; streams and some containers do not report it
+        raise SystemExit(f"[ERROR] {args.video} does not report its frame count / fps "
+                         f"({total_frames} frames @ {fps} fps). Remux it first, e.g. "
+                         f"ffmpeg -i {args.video} -c copy fixed.mp4")
+
+    video_seconds = total_frames / fps
+    interval = 1.0 / args.sample_fps
+    chunk_seconds = max(interval, args.chunk_seconds)
+    starts = [i * chunk_seconds for i in range(int(video_seconds // chunk_seconds) + 1)
+              if i * chunk_seconds < video_seconds]
+    # The last chunk runs to the end of the file in case the count is approximate
+    chunks = [(start, starts[i + 1] if i + 1 < len(starts) else float("inf"))
+              for i, start in enumerate(starts)]
+    print(f"[INFO] {total_frames} frames @ {fps:.1f} fps -> {len(chunks)} chunks, "
+          f"sampling every {interval:.2f} s on {args.workers} workers")
+
+    sightings, samples = {}, 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(args.workers, initializer=init_worker,
+                             initargs=(args.encodings, args.detector)) as pool:
+        futures = [pool.submit(process_chunk, args.video, s, e, interval) for s, e in chunks]
+        for future in as_completed(futures):
+            part, sampled = future.result()
+            merge(sightings, part)
+            samples += sampled
+    wall = time.perf_counter() - started
+
+    print(f"[INFO] {video_seconds:.1f} s of video in {wall:.1f} s wall: "
+          f"{video_seconds / wall:.2f} video-s/wall-s ({samples} frames recognised)")
+
+    start = datetime.datetime.strptime(args.start, "%Y-%m-%d %H:%M:%S") if args.start \
+        else datetime.datetime.fromtimestamp(os.path.getmtime(args.video)) - datetime.timedelta(seconds=video_seconds)
+
+    def to_clock(offset):
+        at = start + datetime.timedelta(seconds=offset)
+        return at.strftime("%Y-%m-%d"), at.strftime("%H:%M:%S")
+
+    return summarise(sightings, samples, args.min_hits), to_clock
+
+
+def run_photos(args):
+    paths = sorted(os.path.join(args.photos, f) for f in os.listdir(args.photos)
+                   if f.lower().endswith(PHOTO_EXTENSIONS))
+    sightings = {}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(args.workers, initializer=init_worker,
+                             initargs=(args.encodings, args.detector)) as pool:
+        for part, _ in pool.map(process_photo, paths, chunksize=4):
+            merge(sightings, part)
+    wall = time.perf_counter() - started
+    print(f"[INFO] {len(paths)} photos in {wall:.1f} s ({len(paths) / wall:.2f} photos/s)")
+
+    def to_clock(mtime):
+        at = datetime.datetime.fromtimestamp(mtime)
+        if args.date:
+            return args.date, at.strftime("%H:%M:%S")
+        return at.strftime("%Y-%m-%d"), at.strftime("%H:%M:%S")
+
+    # A single clear photo is enough evidence
+    return summarise(sightings, len(paths), 1), to_clock
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Take attendance from recorded video or photos")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video")
+    source.add_argument("--photos", help="folder of classroom photos")
+    parser.add_argument("--start", help="wall-clock time of the first video frame (YYYY-MM-DD HH:MM:SS)")
+    parser.add_argument("--date", help="attendance day for photos (default: file date)")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--encodings", default=ENCODINGS_PATH)
+    parser.add_argument("--detector", default=None, help="hog|haar|lbp|dnn (default: FACE_DETECTOR)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-seconds", type=float, default=60.0)
+    parser.add_argument("--sample-fps", type=float, default=2.0, help="frames recognised per video second")
+    parser.add_argument("--min-hits", type=int, default=MIN_HITS)
+    parser.add_argument("--dry-run", action="store_true", help="report only, do not write")
+    args = parser.parse_args()
+
+    results, to_clock = run_video(args) if args.video else run_photos(args)
+    print(f"{'name':<16}{'hits':>6}{'presence':>10}{'mean d':>8}{'conf':>7}  first - last")
+    for r in results:
+        first, last = to_clock(r["first"])[1], to_clock(r["last"])[1]
+        flag = "" if r["marked"] else "  (not marked)"
+        print(f"{r['name']:<16}{r['hits']:>6}{r['presence']:>10.2f}{r['mean_distance']:>8.3f}"
+              f"{r['confidence']:>7.2f}  {first} - {last}{flag}")
+
+    if not args.dry_run:
+        write_attendance(args.db, results, to_clock)
+        print(f"[INFO] Attendance written for {sum(r['marked'] for r in results)} students in one transaction.")
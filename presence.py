@@ -0,0 +1,93 @@
+from collections import OrderedDict
+
+# ✅ Presence Settings (seconds)
+ENTER_DWELL = 2.0          # must be seen this long before "entered" fires
+ENTER_GAP = 3.0            # a gap longer than this restarts the dwell count
+LEAVE_AFTER = 60.0         # unseen this long -> "left" (hysteresis against blinks)
+HEARTBEAT_INTERVAL = 600.0 # refresh the logout time while someone stays present
+STATE_TTL = 3600.0         # forget absent students after this long
+MAX_TRACKED = 512          # hard cap on per-student state
+
+
+class PresenceState:
+    __slots__ = ("first_seen", "last_seen", "present", "entered_at", "last_emit")
+
+    def __init__(self, now):
+        self.first_seen = now
+        self.last_seen = now
+        self.present = False
+        self.entered_at = None
+        self.last_emit = None
+
+
+class PresenceEngine:
+    # Collapses raw sightings into entered / heartbeat / left transitions.
+    # Events are (kind, name, at, dwell) tuples; `at` is the sighting time the
+    # event refers to: first sighting for "entered", last one for "left".
+    def __init__(self, enter_dwell=ENTER_DWELL, enter_gap=ENTER_GAP, leave_after=LEAVE_AFTER,
+                 heartbeat_interval=HEARTBEAT_INTERVAL, ttl=STATE_TTL, max_tracked=MAX_TRACKED):
+        self.enter_dwell = enter_dwell
+        self.enter_gap = enter_gap
+        self.leave_after = leave_after
+        self.heartbeat_interval = heartbeat_interval
+        self.ttl = ttl
+        self.max_tracked = max_tracked
+        self.states = OrderedDict()
+        self.sightings = 0
+        self.counts = {"entered": 0, "heartbeat": 0, "left": 0}
+
+    def observe(self, name, now):
+        self.sightings += 1
+        events = []
+        state = self.states.get(name)
+        if state is None:
+            state = PresenceState(now)
+            self.states[name] = state
+            events.extend(self._enforce_capacity())
+        else:
+            self.states.move_to_end(name)
+            if not state.present and now - state.last_seen > self.enter_gap:
+                state.first_seen = now
+        state.last_seen = now
+
+        if not state.present:
+            if now - state.first_seen >= self.enter_dwell:
+                state.present = True
+                state.entered_at = state.first_seen
+                state.last_emit = now
+                events.append(self._event("entered", name, state.entered_at, state))
+        elif now - state.last_emit >= self.heartbeat_interval:
+            state.last_emit = now
+            events.append(self._event("heartbeat", name, now, state))
+        return events
+
+    def sweep(self, now):
+        events = []
+        for name in list(self.states):
+            state = self.states[name]
+            idle = now - state.last_seen
+            if state.present and idle > self.leave_after:
+                events.append(self._leave(name, state))
+            elif not state.present and idle > self.ttl:
+                del self.states[name]
+        return events
+
+    def flush(self):
+        # Emit "left" for everyone still present (used on shutdown)
+        return [self._leave(name, s) for name, s in list(self.states.items()) if s.present]
+
+    def _leave(self, name, state):
+        state.present = False
+        return self._event("left", name, state.last_seen, state)
+
+    def _enforce_capacity(self):
+        events = []
+        while len(self.states) > self.max_tracked:
+            name, state = self.states.popitem(last=False)
+            if state.present:
+                events.append(self._leave(name, state))
+        return events
+
+    def _event(self, kind, name, at, state):
+        self.counts[kind] += 1
+        return (kind, name, at, at - state.entered_at)
@@ -0,0 +1,147 @@
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+
+# ✅ On-demand profiling for a running process. A capture runs in its own
+# thread for a fixed window and writes three files:
+#   <prefix>.collapsed  sampled CPU stacks, one "a;b;c count" line per stack
+#                       (feed to flamegraph.pl or speedscope); threads that
+#                       used no CPU since the previous sample are skipped, so
+#                       blocked threads (queue.get, sleep, wait) do not show
+#   <prefix>.alloc.txt  tracemalloc top allocations during the window
+#   <prefix>.threads.txt stacks of every thread when the capture started
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/attendance_profiles")
+PROFILE_SECONDS = float(os.environ.get("PROFILE_SECONDS", 10))
+SAMPLE_INTERVAL = 0.005
+TOP_ALLOCATIONS = 50
+MIN_CPU_SHARE = 0.1  # of the sample interval, for a thread to count as running
+# Fallback without per-thread CPU clocks: leaf frames that mean "blocked"
+BLOCKING_CALLS = ("wait", "sleep", "get", "accept", "select")
+
+_capture_lock = threading.Lock()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _collapse(frame):
+    parts = []
+    while frame is not None:
+        parts.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+def _thread_cpu(ident):
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, ValueError, OverflowError):
+        return None
+
+
+def _running(ident, frame, last_cpu, elapsed):
+    cpu = _thread_cpu(ident)
+    if cpu is None:
+        return frame.f_code.co_name not in BLOCKING_CALLS
+    previous = last_cpu.get(ident)
+    last_cpu[ident] = cpu
+    return previous is not None and cpu - previous >= elapsed * MIN_CPU_SHARE
+
+
+def dump_thread_stacks():
+    names = {t.ident: t.name for t in threading.enumerate()}
+    lines = []
+    for ident, frame in sys._current_frames().items():
+        lines.append(f"--- Thread {names.get(ident, '?')} ({ident}) ---")
+        lines.extend(line.rstrip() for line in traceback.format_stack(frame))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _run_capture(prefix, duration, interval):
+    try:
+        own_ident = threading.get_ident()
+        names = {}
+        samples = collections.Counter()
+        thread_stacks = dump_thread_stacks()
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+
+        deadline = time.monotonic() + duration
+        sample_count = 0
+        idle_count = 0
+        last_cpu = {}
+        last_sample = time.monotonic()
+        while time.monotonic() < deadline:
+            if sample_count % 200 == 0:
+                names = {t.ident: t.name for t in threading.enumerate()}
+            now = time.monotonic()
+            elapsed, last_sample = now - last_sample, now
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                if not _running(ident, frame, last_cpu, elapsed):
+                    idle_count += 1
+                    continue
+                samples[f"{names.get(ident, ident)};{_collapse(frame)}"] += 1
+            sample_count += 1
+            time.sleep(interval)
+
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+
+        with open(prefix + ".collapsed", "w") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(prefix + ".alloc.txt", "w") as f:
+            f.write(f"# Top {TOP_ALLOCATIONS} allocation sites over {duration:.0f}s\n")
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+        with open(prefix + ".threads.txt", "w") as f:
+            f.write(thread_stacks)
+
+        print(f"[PROFILE] {sample_count} samples ({idle_count} idle thread samples skipped) "
+              f"written to {prefix}.*")
+    except Exception as e:
+        print(f"[PROFILE] Capture failed: {e}")
+    finally:
+        _capture_lock.release()
+
+
+def start_capture(label, duration=None, interval=SAMPLE_INTERVAL, out_dir=None):
+    # Returns the file prefix, or None if a capture is already running
+    if not _capture_lock.acquire(blocking=False):
+        return None
+    duration = PROFILE_SECONDS if duration is None else duration
+    out_dir = out_dir or PROFILE_DIR
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        prefix = os.path.join(out_dir, f"{label}-{os.getpid()}-{stamp}")
+        thread = threading.Thread(target=_run_capture, args=(prefix, duration, interval),
+                                  name="profiler", daemon=True)
+        thread.start()
+    except Exception:
+        _capture_lock.release()
+        raise
+    print(f"[PROFILE] Capturing {duration:.0f}s profile to {prefix}.*")
+    return prefix
+
+
+def install_signal_trigger(label, signum=signal.SIGUSR2):
+    # `kill -USR2 <pid>` starts a capture without interrupting detection
+    def handler(_signum, _frame):
+        if start_capture(label) is None:
+            print("[PROFILE] Capture already running, signal ignored.")
+
+    signal.signal(signum, handler)
@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+import time
+
+from metrics import REGISTRY
+
+# ✅ Startup / readiness tracking for the detector. Components are marked as
+# they come up; the process is ready once all required ones are. State is
+# written to HEALTH_FILE so systemd, a watchdog or an operator can check it;
+# a timer thread rewrites it, so a hung frame loop shows up as unhealthy.
+PROCESS_STARTED = time.monotonic()
+HEALTH_FILE = os.environ.get("HEALTH_FILE", "/tmp/attendance_detector_health.json")
+HEARTBEAT_EVERY = 5.0    # seconds between health file refreshes
+STALE_AFTER = 30.0       # no frame for this long -> unhealthy
+
+READY = REGISTRY.gauge("detector_ready", "1 once models, gallery, camera and warm-up are done")
+STARTUP_SECONDS = REGISTRY.gauge("detector_startup_seconds", "Seconds from process start to component ready")
+HEALTHY = REGISTRY.gauge("detector_healthy", "1 while ready and frames keep arriving")
+FIRST_RECOGNITION_SECONDS = REGISTRY.gauge("detector_first_recognition_seconds",
+                                           "Seconds from process start to the first recognised face")
+
+
+class Readiness:
+    def __init__(self, required, health_file=HEALTH_FILE):
+        self.required = tuple(required)
+        self.health_file = health_file
+        self.components = {}
+        self.errors = {}
+        self.first_recognition_at = None
+        self.last_frame_at = None
+        self.stopped = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._refresh, name="health-file", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _refresh(self):
+        # Independent of the frame loop, so a stall is reported while it lasts
+        while not self._done.wait(HEARTBEAT_EVERY):
+            self.write()
+
+    def stop(self, reason):
+        # The frame loop is gone for good: not ready, not healthy
+        self.stopped = reason
+        self._done.set()
+        READY.set(0)
+        print(f"[STARTUP] Detector stopped: {reason}")
+        self.write()
+
+    def elapsed(self):
+        return time.monotonic() - PROCESS_STARTED
+
+    def mark(self, component):
+        elapsed = self.elapsed()
+        with self._lock:
+            self.components[component] = elapsed
+        STARTUP_SECONDS.set(round(elapsed, 3), component=component)
+        print(f"[STARTUP] {component} ready after {elapsed:.2f}s")
+        if self.ready:
+            READY.set(1)
+            print(f"[STARTUP] Detector ready after {elapsed:.2f}s")
+        self.write()
+
+    def fail(self, component, error):
+        with self._lock:
+            self.errors[component] = str(error)
+        print(f"[STARTUP] {component} failed: {error}")
+        self.write()
+
+    @property
+    def ready(self):
+        return self.stopped is None and all(c in self.components for c in self.required)
+
+    def recognised(self):
+        if self.first_recognition_at is not None:
+            return
+        self.first_recognition_at = self.elapsed()
+        FIRST_RECOGNITION_SECONDS.set(round(self.first_recognition_at, 3))
+        print(f"[STARTUP] Time to first recognition: {self.first_recognition_at:.2f}s")
+        self.write()
+
+    def heartbeat(self):
+        self.last_frame_at = time.monotonic()
+
+    def healthy(self):
+        if not self.ready or self.errors:
+            return False
+        return self.last_frame_at is not None and time.monotonic() - self.last_frame_at < STALE_AFTER
+
+    def status(self):
+        with self._lock:
+            components = dict(self.components)
+            errors = dict(self.errors)
+        frame_age = None if self.last_frame_at is None else round(time.monotonic() - self.last_frame_at, 1)
+        return {
+            "pid": os.getpid(),
+            "ready": self.ready,
+            "healthy": self.healthy(),
+            "components": components,
+            "errors": errors,
+            "stopped": self.stopped,
+            "first_recognition_s": self.first_recognition_at,
+            "last_frame_age_s": frame_age,
+            "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    def write(self):
+        status = self.status()
+        HEALTHY.set(1 if status["healthy"] else 0)
+        if not self.health_file:
+            return
+        try:
+            tmp_path = self.health_file + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(status, f)
+            os.replace(tmp_path, self.health_file)
+        except OSError as e:
+            print(f"[STARTUP] Could not write health file: {e}")
@@ -0,0 +1,63 @@
+import base64
+import time
+
+import cv2
+import requests
+
+# ✅ Kiosk side of recognition_service.py. Each face is cropped with a margin
+# (the landmark model needs some context around the box), JPEG-encoded, and
+# all faces of a frame go out in one request. After a failure the client
+# backs off, so a slow or down server costs one timeout per RETRY_AFTER
+# instead of one per frame; tracks simply stay unverified until then.
+CROP_MARGIN = 0.25
+JPEG_QUALITY = 85
+RETRY_AFTER = 2.0
+
+
+def crop_face(frame, box, margin=CROP_MARGIN):
+    # -> (crop view, box relative to the crop)
+    top, right, bottom, left = (int(v) for v in box)
+    h, w = frame.shape[:2]
+    pad_y = int((bottom - top) * margin)
+    pad_x = int((right - left) * margin)
+    y0, y1 = max(0, top - pad_y), min(h, bottom + pad_y)
+    x0, x1 = max(0, left - pad_x), min(w, right + pad_x)
+    return frame[y0:y1, x0:x1], (top - y0, right - x0, bottom - y0, left - x0)
+
+
+def encode_face(frame, box, quality=JPEG_QUALITY):
+    crop, inner = crop_face(frame, box)
+    ok, jpeg = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        return None
+    return {"jpeg": base64.b64encode(jpeg.tobytes()).decode("ascii"), "box": list(inner)}
+
+
+class RecognitionClient:
+    def __init__(self, url, device_id, timeout=3.0, quality=JPEG_QUALITY):
+        self.url = url
+        self.device_id = device_id
+        self.timeout = timeout
+        self.quality = quality
+        self.session = requests.Session()
+        self.retry_at = 0.0
+
+    def identify(self, frame, boxes):
+        # frame is BGR; -> [(nearest name, distance), ...] aligned with boxes,
+        # or None when the server is unavailable. The caller applies its
+        # tolerance; the nearest name is None for an empty gallery
+        if time.monotonic() < self.retry_at:
+            return None
+        faces = [encode_face(frame, box, self.quality) for box in boxes]
+        if None in faces:
+            return None
+        try:
+            response = self.session.post(self.url, json={"device_id": self.device_id, "faces": faces},
+                                         timeout=self.timeout)
+            if response.status_code == 200:
+                return [(r["match"], r["distance"]) for r in response.json()["results"]]
+            print(f"[WARN] Recognition server: {response.status_code} - {response.text[:200]}")
+        except requests.RequestException as e:
+            print(f"[WARN] Recognition server unreachable: {e}")
+        self.retry_at = time.monotonic() + RETRY_AFTER
+        return None
@@ -0,0 +1,268 @@
+import base64
+import os
+import pickle
+import threading
+import time
+from queue import Queue, Full, Empty
+
+import cv2
+import numpy as np
+from flask import Blueprint, request, jsonify, abort
+
+from gallery import load_gallery
+from metrics import REGISTRY
+
+# ✅ Central recognition for thin kiosks. Devices POST JPEG face crops to
+# /recognize; one batcher thread gathers crops from every device for up to
+# RECOGNITION_MAX_WAIT_MS (or RECOGNITION_MAX_BATCH crops), encodes them in a
+# single dlib call and matches them against one shared in-memory gallery with
+# distances_batch(). Each crop gets its nearest gallery name and distance; the
+# kiosk applies its own TOLERANCE, so accepting a match and locking a track use
+# the same threshold. Batches are capped so the oldest request is still
+# answered within RECOGNITION_TIMEOUT (using a running per-crop encode cost),
+# and requests that can no longer make it get a 503 straight away, so kiosk
+# latency stays bounded under overload.
+# Enabled in app.py with RECOGNITION_SERVICE=1; run one worker process with
+# threads (gunicorn -w 1 --threads 16) so all devices share the same batches.
+ENCODINGS_PATH = os.environ.get("RECOGNITION_ENCODINGS", "encodings.pickle")
+MAX_BATCH = int(os.environ.get("RECOGNITION_MAX_BATCH", 32))
+MAX_WAIT = float(os.environ.get("RECOGNITION_MAX_WAIT_MS", 20)) / 1000.0
+MAX_QUEUE = int(os.environ.get("RECOGNITION_MAX_QUEUE", 256))
+TIMEOUT = float(os.environ.get("RECOGNITION_TIMEOUT", 2.0))
+MAX_FACES_PER_REQUEST = 16
+
+BATCH_SIZE = REGISTRY.histogram("recognition_batch_size", "Crops per encode batch",
+                                buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+QUEUE_WAIT = REGISTRY.histogram("recognition_queue_wait_seconds", "Time a request waited for its batch")
+BATCH_SECONDS = REGISTRY.histogram("recognition_batch_seconds", "Encode + match time per batch")
+MATCH_DISTANCE = REGISTRY.histogram("recognition_match_distance", "Distance to the nearest gallery face per crop",
+                                    buckets=(0.3, 0.4, 0.45, 0.5, 0.55, 0.6, 0.7, 0.8, 1.0))
+REJECTED = REGISTRY.counter("recognition_rejected_total", "Requests refused by reason")
+QUEUE_DEPTH = REGISTRY.gauge("recognition_queue_depth", "Requests waiting for a batch")
+
+recognition_bp = Blueprint("recognition", __name__)
+
+
+def encode_batch(crops, boxes):
+    # One landmark pass per crop, then a single batched descriptor call.
+    # Same 5-point model and jitter as face_recognition.face_encodings(), so
+    # descriptors match the ones stored by encode_faces.py
+    import dlib
+    from face_recognition import api
+    shapes = []
+    for rgb, (top, right, bottom, left) in zip(crops, boxes):
+        faces = dlib.full_object_detections()
+        faces.append(api.pose_predictor_5_point(rgb, dlib.rectangle(left, top, right, bottom)))
+        shapes.append(faces)
+    descriptors = api.face_encoder.compute_face_descriptor(crops, shapes, 1)
+    return np.array([np.array(faces[0]) for faces in descriptors])
+
+
+class _Pending:
+    __slots__ = ("crops", "boxes", "queued", "done", "results", "batch_size", "waited", "error")
+
+    def __init__(self, crops, boxes):
+        self.crops = crops
+        self.boxes = boxes
+        self.queued = time.monotonic()
+        self.done = threading.Event()
+        self.results = None
+        self.batch_size = 0
+        self.waited = 0.0
+        self.error = None
+
+
+class RecognitionService:
+    def __init__(self, gallery, max_batch=MAX_BATCH, max_wait=MAX_WAIT, max_queue=MAX_QUEUE,
+                 timeout=TIMEOUT, encoder=encode_batch):
+        self.gallery = gallery
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.encoder = encoder
+        self.queue = Queue(maxsize=max_queue)
+        self.crop_seconds = None  # running encode cost per crop; the first batch measures it
+        self._carry = None
+        self.thread = threading.Thread(target=self._run, name="recognition-batcher", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def submit(self, crops, boxes):
+        # -> pending request, or None when the queue is full
+        pending = _Pending(crops, boxes)
+        try:
+            self.queue.put_nowait(pending)
+        except Full:
+            return None
+        QUEUE_DEPTH.set(self.queue.qsize())
+        return pending
+
+    def _expired(self, pending):
+        waited = time.monotonic() - pending.queued
+        if waited + (self.crop_seconds or 0.0) * len(pending.crops) <= self.timeout:
+            return False
+        # Cannot be answered in time any more; fail fast instead of encoding it
+        pending.error = "expired"
+        REJECTED.inc(reason="expired")
+        pending.done.set()
+        return True
+
+    def _next(self, timeout=None):
+        if self._carry is not None:
+            item, self._carry = self._carry, None
+            return item
+        if timeout is None:
+            return self.queue.get()
+        return self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+
+    def _collect(self):
+        first = self._next()
+        while self._expired(first):
+            first = self._next()
+        batch, count = [first], len(first.crops)
+        # Largest batch the oldest request can still wait for
+        if self.crop_seconds is None:
+            limit = count
+        else:
+            budget = self.timeout - (time.monotonic() - first.queued)
+            limit = min(self.max_batch, max(count, int(budget / self.crop_seconds)))
+        # Wait at most max_wait after the oldest request arrived; a backlog
+        # that is already queued is drained without waiting
+        deadline = first.queued + self.max_wait
+        while count < limit:
+            try:
+                item = self._next(deadline - time.monotonic())
+            except Empty:
+                break
+            if self._expired(item):
+                continue
+            if count + len(item.crops) > limit:
+                self._carry = item
+                break
+            batch.append(item)
+            count += len(item.crops)
+        QUEUE_DEPTH.set(self.queue.qsize())
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            now = time.monotonic()
+            for pending in batch:
+                pending.waited = now - pending.queued
+                QUEUE_WAIT.observe(pending.waited)
+            self._process(batch)
+
+    def _process(self, batch):
+        crops = [crop for pending in batch for crop in pending.crops]
+        boxes = [box for pending in batch for box in pending.boxes]
+        BATCH_SIZE.observe(len(crops))
+        started = time.monotonic()
+        try:
+            distances = self.gallery.distances_batch(self.encoder(crops, boxes))
+        except Exception as e:
+            print(f"[ERROR] Recognition batch failed: {e}")
+            for pending in batch:
+                pending.error = str(e)
+                pending.done.set()
+            return
+        elapsed = time.monotonic() - started
+        BATCH_SECONDS.observe(elapsed)
+        per_crop = elapsed / len(crops)
+        self.crop_seconds = per_crop if self.crop_seconds is None else 0.8 * self.crop_seconds + 0.2 * per_crop
+
+        row = 0
+        for pending in batch:
+            results = []
+            for _ in pending.crops:
+                index = int(distances[row].argmin()) if len(self.gallery) else None
+                distance = float(distances[row][index]) if index is not None else float("inf")
+                if index is not None:
+                    MATCH_DISTANCE.observe(distance)
+                results.append({"match": self.gallery.names[index] if index is not None else None,
+                                "distance": round(distance, 4)})
+                row += 1
+            pending.results = results
+            pending.batch_size = len(crops)
+            pending.done.set()
+
+
+# The service (gallery + batcher thread) starts on the first request, after
+# gunicorn has forked the worker
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                with open(ENCODINGS_PATH, "rb") as f:
+                    gallery = load_gallery(pickle.load(f))
+                print(f"[INFO] Recognition service: {len(gallery)} faces, {gallery.format}, "
+                      f"batch <= {MAX_BATCH}, wait <= {MAX_WAIT * 1000:.0f} ms")
+                _service = RecognitionService(gallery).start()
+    return _service
+
+
+def decode_face(face):
+    # {"jpeg": base64, "box": [top, right, bottom, left] inside the crop} -> (rgb, box)
+    try:
+        raw = np.frombuffer(base64.b64decode(face["jpeg"]), dtype=np.uint8)
+    except (KeyError, TypeError, ValueError):
+        return None, None
+    image = cv2.imdecode(raw, cv2.IMREAD_COLOR)
+    if image is None:
+        return None, None
+    h, w = image.shape[:2]
+    box = face.get("box") or (0, w, h, 0)
+    try:
+        top, right, bottom, left = (int(v) for v in box)
+    except (TypeError, ValueError):
+        return None, None
+    top, left = max(0, top), max(0, left)
+    right, bottom = min(w, right), min(h, bottom)
+    if right <= left or bottom <= top:
+        return None, None
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB), (top, right, bottom, left)
+
+
+@recognition_bp.route('/recognize', methods=['POST'])
+def recognize():
+    data = request.get_json(force=True, silent=True) or {}
+    faces = data.get('faces')
+    if not isinstance(faces, list) or not faces:
+        abort(400, description="faces must be a non-empty list")
+    if len(faces) > MAX_FACES_PER_REQUEST:
+        abort(400, description=f"At most {MAX_FACES_PER_REQUEST} faces per request")
+
+    crops, boxes = [], []
+    for face in faces:
+        crop, box = decode_face(face) if isinstance(face, dict) else (None, None)
+        if crop is None:
+            abort(400, description="Undecodable face crop")
+        crops.append(crop)
+        boxes.append(box)
+
+    try:
+        service = get_service()
+    except Exception as e:
+        print(f"[ERROR] Recognition service unavailable: {e}")
+        return jsonify({'error': 'recognition service unavailable'}), 503
+
+    pending = service.submit(crops, boxes)
+    if pending is None:
+        REJECTED.inc(reason="queue_full")
+        return jsonify({'error': 'busy'}), 503
+    # The batcher answers within timeout; the slack covers one slow batch
+    if not pending.done.wait(service.timeout + 0.5):
+        REJECTED.inc(reason="timeout")
+        return jsonify({'error': 'timeout'}), 503
+    if pending.error:
+        return jsonify({'error': pending.error}), 503
+
+    return jsonify({'results': pending.results, 'batch_size': pending.batch_size,
+                    'queue_ms': round(pending.waited * 1000.0, 2)}), 200
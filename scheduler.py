@@ -0,0 +1,119 @@
+import os
+import time
+
+from metrics import REGISTRY
+
+# ✅ Adaptive frame rate for the detection loop (replaces the fixed 0.1 s sleep).
+# The loop idles at SCHED_IDLE_FPS and jumps to SCHED_ACTIVE_FPS as soon as a
+# face is seen, dropping back after IDLE_AFTER seconds without faces. While
+# active the rate is capped by:
+#   cpu      process CPU per processed frame (time.process_time over the last
+#            window, all threads) against SCHED_CPU_BUDGET (1.0 = one core)
+#   thermal  SoC temperature: linear back-off from SCHED_TEMP_SOFT, idle rate
+#            at SCHED_TEMP_HARD (the Pi firmware throttles at 80 °C)
+#   queue    attendance writes backing up past SCHED_QUEUE_HIGH halve the rate
+# The sleep is measured from the start of the frame, so slow frames eat into
+# their own period instead of adding to it.
+IDLE_FPS = float(os.environ.get("SCHED_IDLE_FPS", 1.0))
+ACTIVE_FPS = float(os.environ.get("SCHED_ACTIVE_FPS", 10.0))
+CPU_BUDGET = float(os.environ.get("SCHED_CPU_BUDGET", 0.7))
+TEMP_SOFT = float(os.environ.get("SCHED_TEMP_SOFT", 65.0))
+TEMP_HARD = float(os.environ.get("SCHED_TEMP_HARD", 78.0))
+QUEUE_HIGH = int(os.environ.get("SCHED_QUEUE_HIGH", 50))
+IDLE_AFTER = 3.0        # seconds without faces before dropping to the idle rate
+SAMPLE_INTERVAL = 1.0   # CPU and temperature are sampled at most this often
+THERMAL_PATH = "/sys/class/thermal/thermal_zone0/temp"
+
+FPS = REGISTRY.gauge("scheduler_fps", "Target detection rate")
+CPU_RATIO = REGISTRY.gauge("scheduler_cpu_ratio", "Process CPU over the last window (1.0 = one core)")
+FRAME_CPU = REGISTRY.gauge("scheduler_frame_cpu_seconds", "Process CPU per processed frame")
+TEMPERATURE = REGISTRY.gauge("scheduler_temperature_celsius", "SoC temperature")
+DECISIONS = REGISTRY.counter("scheduler_decisions_total", "Changes of the factor setting the rate, by reason")
+
+
+def read_temperature(path=THERMAL_PATH):
+    try:
+        with open(path) as f:
+            return int(f.read().strip()) / 1000.0
+    except (OSError, ValueError):
+        return None  # not a Pi, or no thermal zone exposed
+
+
+class FrameScheduler:
+    def __init__(self, idle_fps=IDLE_FPS, active_fps=ACTIVE_FPS, cpu_budget=CPU_BUDGET,
+                 temp_soft=TEMP_SOFT, temp_hard=TEMP_HARD, queue_high=QUEUE_HIGH,
+                 idle_after=IDLE_AFTER, temperature=read_temperature):
+        self.idle_fps = idle_fps
+        self.active_fps = active_fps
+        self.cpu_budget = cpu_budget
+        self.temp_soft = temp_soft
+        self.temp_hard = temp_hard
+        self.queue_high = queue_high
+        self.idle_after = idle_after
+        self.read_temperature = temperature
+
+        self.fps = idle_fps
+        self.reason = "idle"
+        self.frame_cost = None      # EMA of wall time spent on a frame
+        self.frame_cpu = None       # process CPU per frame over the last window
+        self.cpu_ratio = None
+        self.temperature = None
+        self.last_face = None
+        self.frame_started = time.monotonic()
+        self._window_wall = self.frame_started
+        self._window_cpu = time.process_time()
+        self._window_frames = 0
+        FPS.set(self.fps)
+
+    def begin(self):
+        self.frame_started = time.monotonic()
+
+    def end(self, faces, queue_depth=0):
+        # -> seconds to sleep before the next frame
+        now = time.monotonic()
+        busy = now - self.frame_started
+        self.frame_cost = busy if self.frame_cost is None else 0.8 * self.frame_cost + 0.2 * busy
+        self._window_frames += 1
+        if faces:
+            self.last_face = now
+        if now - self._window_wall >= SAMPLE_INTERVAL:
+            self._sample(now)
+
+        fps, reason = self.decide(now, queue_depth)
+        if reason != self.reason:
+            DECISIONS.inc(reason=reason)
+        self.fps, self.reason = fps, reason
+        FPS.set(fps)
+        return max(0.0, self.frame_started + 1.0 / fps - time.monotonic())
+
+    def _sample(self, now):
+        cpu = time.process_time()
+        self.cpu_ratio = (cpu - self._window_cpu) / (now - self._window_wall)
+        self.frame_cpu = (cpu - self._window_cpu) / self._window_frames
+        self._window_wall, self._window_cpu, self._window_frames = now, cpu, 0
+        CPU_RATIO.set(self.cpu_ratio)
+        FRAME_CPU.set(self.frame_cpu)
+
+        self.temperature = self.read_temperature()
+        if self.temperature is not None:
+            TEMPERATURE.set(self.temperature)
+
+    def decide(self, now, queue_depth=0):
+        # -> (fps, reason): the lowest of the activity target and each limit
+        if self.temperature is not None and self.temperature >= self.temp_hard:
+            return self.idle_fps, "thermal"
+        if self.last_face is None or now - self.last_face >= self.idle_after:
+            return self.idle_fps, "idle"
+
+        fps, reason = self.active_fps, "active"
+        per_frame = self.frame_cpu or self.frame_cost
+        if per_frame and self.cpu_budget / per_frame < fps:
+            fps, reason = self.cpu_budget / per_frame, "cpu"
+        if self.temperature is not None and self.temperature > self.temp_soft:
+            share = (self.temp_hard - self.temperature) / (self.temp_hard - self.temp_soft)
+            limit = self.idle_fps + (self.active_fps - self.idle_fps) * share
+            if limit < fps:
+                fps, reason = limit, "thermal"
+        if queue_depth >= self.queue_high:
+            fps, reason = fps * 0.5, "queue"
+        return max(self.idle_fps, min(self.active_fps, fps)), reason
@@ -0,0 +1,61 @@
+import argparse
+import random
+import threading
+import time
+
+from flask import Flask, jsonify
+
+# Local stand-in for the Render server that app.py pushes to. Latency and
+# failures are configurable so load tests do not depend on (or hammer) the
+# real deployment:
+#   python upstream_stub.py --port 5100 --latency-ms 150 --jitter-ms 100 --failure-rate 0.05
+#   RENDER_UPLOAD_URL=http://127.0.0.1:5100/upload gunicorn app:app
+
+stub = Flask(__name__)
+settings = {"latency_ms": 100.0, "jitter_ms": 50.0, "failure_rate": 0.0, "hang_rate": 0.0, "hang_s": 10.0}
+counts = {"received": 0, "failed": 0, "hung": 0}
+counts_lock = threading.Lock()
+
+
+def _count(key):
+    with counts_lock:
+        counts[key] += 1
+
+
+@stub.route('/upload', methods=['POST'])
+def upload():
+    _count("received")
+    roll = random.random()
+    if roll < settings["hang_rate"]:
+        # Longer than app.py's 5 s push timeout
+        _count("hung")
+        time.sleep(settings["hang_s"])
+        return jsonify({'status': 'late'}), 200
+
+    delay = settings["latency_ms"] + random.uniform(-settings["jitter_ms"], settings["jitter_ms"])
+    time.sleep(max(delay, 0.0) / 1000.0)
+    if roll < settings["hang_rate"] + settings["failure_rate"]:
+        _count("failed")
+        return jsonify({'error': 'injected failure'}), 503
+    return jsonify({'status': 'success'}), 200
+
+
+@stub.route('/stats')
+def stats():
+    with counts_lock:
+        return jsonify(dict(counts, **settings))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render upstream stand-in for load tests")
+    parser.add_argument("--port", type=int, default=5100)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction answered with 503")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction held past the push timeout")
+    parser.add_argument("--hang-s", type=float, default=10.0)
+    args = parser.parse_args()
+    settings.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, failure_rate=args.failure_rate,
+                    hang_rate=args.hang_rate, hang_s=args.hang_s)
+    print(f"[INFO] Upstream stub on :{args.port} with {settings}")
+    stub.run(host="127.0.0.1", port=args.port, threaded=True)